@@ -11,9 +11,15 @@
 This file contains the Arm class
 """
 
+import math
+import numpy as np
 from const import *
 from armLink import ArmLink
 
+# cos/sin of every whole degree, computed with the same math calls as computeCoordinate
+COS_TABLE = np.array([math.cos(math.radians(angle)) for angle in range(360)])
+SIN_TABLE = np.array([math.sin(math.radians(angle)) for angle in range(360)])
+
 class Arm:
     def __init__(self, armBasePos, armLinkSpec):
 
@@ -72,6 +78,11 @@ class Arm:
         """
         return self.__armLimit
 
+    def getArmLinkLengths(self):
+        """This function returns the length of all arm links
+        """
+        return [armLink.getLength() for armLink in self.__armLinks]
+
     def getNumArmLinks(self):
         """This function returns the number of arm links of this arm
         """
@@ -95,4 +106,98 @@ class Arm:
             self.__armLinks[i].setBase(base)
             base = self.__armLinks[i].getEnd()
 
-        return True
\ No newline at end of file
+        return True
+
+def getArmAngleAxes(arm, granularity):
+    """This function returns the joint angles of every link over its limit, one array per link.
+       These are the axes of the configuration space, e.g. [alphas, betas] for two links.
+    """
+    axes = []
+    for minAngle, maxAngle in arm.getArmLimit():
+        count = int(((maxAngle - minAngle) / granularity) + 1)
+        axes.append(minAngle + np.arange(count) * granularity)
+    return axes
+
+def getArmAngleGrid(arm, granularity):
+    """This function returns every (alpha, beta, gamma) of the configuration space as an
+       (N, links) array, in the same order the transform visits them.
+    """
+    axes = getArmAngleAxes(arm, granularity)
+    grid = np.meshgrid(*axes, indexing='ij')
+    return np.stack([angles.ravel() for angles in grid], axis=1)
+
+def lookUpCosSin(angles):
+    """This function returns (cos, sin) of absolute angles in degrees, using the tables for
+       whole degrees so the results match computeCoordinate exactly.
+    """
+    angles = np.asarray(angles)
+    if np.issubdtype(angles.dtype, np.integer):
+        angles = np.mod(angles, 360)
+        return COS_TABLE[angles], SIN_TABLE[angles]
+    radians = np.radians(np.mod(angles, 360))
+    return np.cos(radians), np.sin(radians)
+
+def computeArmJointsBatch(armBase, armLinkLengths, angles):
+    """This function computes the forward kinematics for a batch of arm configurations.
+
+        Args:
+            armBase (tuple): (x, y) of the arm base
+            armLinkLengths (list): length of every arm link
+            angles (ndarray): (N, links) relative angles (alpha, beta, gamma) of the arm links
+
+        Return:
+            ndarray: (N, links + 1, 2) positions of the base, every joint and the arm tick
+    """
+    angles = np.asarray(angles)
+    numLinks = len(armLinkLengths)
+    joints = np.empty((angles.shape[0], numLinks + 1, 2))
+    joints[:, 0] = armBase
+
+    totalAngles = np.cumsum(angles[:, :numLinks], axis=1)
+    for i in range(numLinks):
+        cos, sin = lookUpCosSin(totalAngles[:, i])
+        joints[:, i + 1, 0] = joints[:, i, 0] + (cos * armLinkLengths[i])
+        # y+ goes down from top left, same as computeCoordinate
+        joints[:, i + 1, 1] = joints[:, i, 1] - (sin * armLinkLengths[i])
+    return joints
+
+def computeArmGridJoints(arm, granularity, alphaIndexes=None):
+    """This function computes the forward kinematics for the whole configuration space grid.
+       Absolute angles are built with cumulative sums over the angle axes, so the positions of
+       link i are computed once per (alpha, ..., link i angle) instead of once per cell.
+
+        Args:
+            arm (Arm): arm instance
+            granularity (int): unit of increasing/decreasing degree for angles
+            alphaIndexes (slice): optional range of alpha rows to compute
+
+        Return:
+            ndarray: (rows, cols, depths, links + 1, 2) positions of the base, every joint and
+                     the arm tick for every cell of the grid
+    """
+    axes = getArmAngleAxes(arm, granularity)
+    if alphaIndexes is not None:
+        axes[ALPHA] = axes[ALPHA][alphaIndexes]
+    armLinkLengths = arm.getArmLinkLengths()
+    numLinks = len(axes)
+    shape = tuple(len(axis) for axis in axes)
+
+    joints = np.empty(shape + (numLinks + 1, 2))
+    joints[..., 0, :] = arm.getBase()
+
+    totalAngles = 0
+    for i in range(numLinks):
+        # angles of link i vary along the first i + 1 axes only
+        axisShape = [1] * numLinks
+        axisShape[i] = -1
+        totalAngles = totalAngles + axes[i].reshape(axisShape)
+        cos, sin = lookUpCosSin(totalAngles)
+        joints[..., i + 1, 0] = joints[..., i, 0] + (cos * armLinkLengths[i])
+        joints[..., i + 1, 1] = joints[..., i, 1] - (sin * armLinkLengths[i])
+    return joints
+
+def jointsToArmPos(joints):
+    """This function converts (..., links + 1, 2) joint positions to (..., links, 2, 2)
+       (start, end) positions of all arm links, the format getArmPos returns.
+    """
+    return np.stack((joints[..., :-1, :], joints[..., 1:, :]), axis=-2)
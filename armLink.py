@@ -11,7 +11,7 @@
 This file contains the ArmLink class
 """
 
-from geometry import *
+from geometry import computeCoordinate
 
 class ArmLink:
     def __init__(self, base, length, angle):
@@ -19,13 +19,16 @@ class ArmLink:
         self.__base = base
         self.__length = length        
         self.__angle = angle        
+        self.__end = None
 
     def setBase(self, base):
         self.__base = base                
+        self.__end = None
 
     def setAngle(self, angle):
         # This angle is absolute angle, not alpha or beta or gamma        
         self.__angle = angle                  
+        self.__end = None
 
     def getBase(self):
         return self.__base
@@ -43,5 +46,7 @@ class ArmLink:
         self.__end = computeCoordinate(self.__base, self.__length, self.__angle)
 
     def getEnd(self):
-        self.computeEnd()
+        # the end only changes with the base or the angle, so it is computed once per change
+        if self.__end is None:
+            self.computeEnd()
         return self.__end  
\ No newline at end of file
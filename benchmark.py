@@ -0,0 +1,208 @@
+# benchmark.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the benchmark of the transform and the search methods on the maps of
+the config file. It sweeps the granularity and the number of arm links, and compares the
+run against a stored baseline to catch slowdowns. The time per explored state should stay
+flat as the mazes grow, which shows the search scales linearly with the number of explored
+states.
+"""
+
+import argparse
+import configparser
+import json
+import multiprocessing
+import sys
+import time
+
+from arm import Arm
+from transform import transformToMaze
+from search import search, SEARCH_METHODS
+from runner import getPeakMemoryMB
+from const import *
+from util import loadMapConfig
+
+# a case is slower than the baseline once its time passes the baseline time by this fraction
+DEFAULT_THRESHOLD = 0.25
+
+# cases faster than this many seconds are too noisy to compare with the baseline
+MIN_COMPARED_TIME = 0.005
+
+def buildMaze(config, map_name, granularity, numLinks=None, engine="numpy"):
+    """Builds the maze of the given config section with the first numLinks links of the arm,
+       all of them if None, or returns None if it has no start or objectives
+    """
+    window, armBase, armLinks, obstacles, goals = loadMapConfig(config, map_name)
+    if numLinks is not None:
+        armLinks = armLinks[:numLinks]
+    try:
+        return transformToMaze(Arm(armBase, armLinks), goals, obstacles, window, granularity, engine)
+    except SystemExit:
+        return None
+
+def benchmarkTransform(config, map_name, granularity, numLinks, engine, repeat):
+    """Returns the best time of the given number of transforms, with the maze
+    """
+    best = None
+    for i in range(repeat):
+        startTime = time.perf_counter()
+        maze = buildMaze(config, map_name, granularity, numLinks, engine)
+        elapsed = time.perf_counter() - startTime
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, maze
+
+def benchmarkSearch(maze, searchMethod, repeat):
+    """Returns the best time of the given number of runs, with the path and number of explored states.
+       Every run starts without a cached distance field, so a field a run builds is timed
+       and no run or method depends on the ones before it
+    """
+    best = None
+    for i in range(repeat):
+        startTime = time.perf_counter()
+        maze.resetDistanceField()
+        path, numExplored = search(maze, searchMethod)
+        elapsed = time.perf_counter() - startTime
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, path, numExplored
+
+def benchmarkCase(case):
+    """Benchmarks the transform and every search method on one map, number of links and
+       granularity.
+
+        Args:
+            case (tuple): (config file, map name, number of links, granularity, engine,
+                          search methods, repeat)
+
+        Return:
+            list of result dicts, the transform first and then one per search method
+    """
+    configFile, map_name, numLinks, granularity, engine, searchMethods, repeat = case
+    config = configparser.ConfigParser()
+    config.read(configFile)
+    key = {"map": map_name, "links": numLinks, "granularity": granularity}
+
+    elapsed, maze = benchmarkTransform(config, map_name, granularity, numLinks, engine, repeat)
+    if maze is None:
+        return [dict(key, phase="transform", status="no maze", time=elapsed, peakMemoryMB=getPeakMemoryMB())]
+
+    cells = 1
+    for size in maze.getDimensions():
+        cells *= size
+    results = [dict(key, phase="transform", status="ok", time=elapsed, cells=cells,
+                    cellsPerSecond=cells / max(elapsed, 1e-9))]
+    for searchMethod in searchMethods:
+        elapsed, path, numExplored = benchmarkSearch(maze, searchMethod, repeat)
+        results.append(dict(key, phase=searchMethod, status="ok", time=elapsed, cells=cells,
+                            pathLength=len(path), explored=numExplored,
+                            exploredPerSecond=numExplored / max(elapsed, 1e-9)))
+
+    # every case runs in its own process, so the peak is the peak of this case
+    peakMemory = getPeakMemoryMB()
+    for result in results:
+        result["peakMemoryMB"] = peakMemory
+    return results
+
+def runSuite(configFile, maps, linkCounts, granularities, searchMethods, engine="numpy", repeat=3):
+    """Runs every case of the sweep one after another, each in a fresh process. Link counts
+       above the number of links of a map are skipped for that map.
+
+        Return:
+            list of result dicts in the order of the maps, link counts and granularities
+    """
+    config = configparser.ConfigParser()
+    config.read(configFile)
+    cases = []
+    for map_name in (maps if maps else config.sections()):
+        numArmLinks = len(loadMapConfig(config, map_name)[2])
+        counts = [count for count in linkCounts if count <= numArmLinks] if linkCounts else [numArmLinks]
+        for numLinks in counts:
+            for granularity in granularities:
+                cases.append((configFile, map_name, numLinks, granularity, engine, searchMethods, repeat))
+
+    # one worker, so the cases do not compete for the cpus and time each other
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        results = pool.map(benchmarkCase, cases, 1)
+    return [result for caseResults in results for result in caseResults]
+
+def getResultKey(result):
+    return (result["map"], result["links"], result["granularity"], result["phase"])
+
+def compareToBaseline(results, baseline, threshold):
+    """Returns the (result, baseline time) of every result that is slower than the same case
+       of the baseline by more than the threshold
+    """
+    baselineTimes = dict((getResultKey(result), result["time"]) for result in baseline
+                         if result["status"] == "ok")
+    slowdowns = []
+    for result in results:
+        baselineTime = baselineTimes.get(getResultKey(result))
+        if result["status"] != "ok" or baselineTime is None:
+            continue
+        if max(result["time"], baselineTime) < MIN_COMPARED_TIME:
+            continue
+        if result["time"] > baselineTime * (1 + threshold):
+            slowdowns.append((result, baselineTime))
+    return slowdowns
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='CS440 MP2 Benchmark')
+
+    parser.add_argument('--config', dest="config", type=str, default = CONFIG_FILE,
+                        help='configuration filename - default '+CONFIG_FILE)
+    parser.add_argument('--maps', dest="maps", type=str, nargs='+', default = None,
+                        help='map sections to run - default all sections')
+    parser.add_argument('--method', dest="search", type=str, nargs='+', default = ["astar"],
+                        choices = SEARCH_METHODS,
+                        help='search methods - default astar')
+    parser.add_argument('--granularity', dest="granularity", type=int, nargs='+', default = [10, 5, 2],
+                        help='degree granularities to run - default 10 5 2')
+    parser.add_argument('--links', dest="links", type=int, nargs='+', default = None,
+                        help='numbers of arm links to run with the first links of every arm - default all links')
+    parser.add_argument('--engine', dest="engine", type=str, default = "numpy",
+                        choices = TRANSFORM_ENGINES,
+                        help='engine that transforms the map to the maze - default numpy')
+    parser.add_argument('--repeat', dest="repeat", type=int, default = 3,
+                        help='number of runs per case, the best is reported - default 3')
+    parser.add_argument('--output', dest="output", type=str, default = None,
+                        help='write the results as JSON to this file, to use as a baseline - default not written')
+    parser.add_argument('--baseline', dest="baseline", type=str, default = None,
+                        help='fail when a case is slower than in this results file - default not compared')
+    parser.add_argument('--threshold', dest="threshold", type=float, default = DEFAULT_THRESHOLD,
+                        help='fraction a case may be slower than the baseline - default '+str(DEFAULT_THRESHOLD))
+
+    args = parser.parse_args()
+    results = runSuite(args.config, args.maps, args.links, args.granularity, args.search, args.engine, args.repeat)
+
+    print("%-10s %5s %5s %-13s %10s %10s %12s %10s %12s %8s" % ("map", "links", "gran", "phase", "cells", "time(s)",
+          "cells/s", "explored", "explored/s", "peakMB"))
+    for result in results:
+        if result["status"] != "ok":
+            print("%-10s %5d %5d   skipped, maze has no start or objectives" % (result["map"], result["links"], result["granularity"]))
+            continue
+        print("%-10s %5d %5d %-13s %10d %10.4f %12.0f %10d %12.0f %8.1f" % (result["map"], result["links"], result["granularity"],
+              result["phase"], result["cells"], result["time"], result.get("cellsPerSecond", 0), result.get("explored", 0),
+              result.get("exploredPerSecond", 0), result["peakMemoryMB"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Results written to %s" % (args.output))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slowdowns = compareToBaseline(results, baseline, args.threshold)
+        for result, baselineTime in slowdowns:
+            print("SLOWER %s %d links granularity %d %s: %.4f s, baseline %.4f s" % (result["map"], result["links"],
+                  result["granularity"], result["phase"], result["time"], baselineTime))
+        if slowdowns:
+            sys.exit(1)
+        print("No case is more than %d%% slower than the baseline" % (args.threshold * 100))
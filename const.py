@@ -32,3 +32,8 @@ GAMMA = 2
 
 DEFAULT_FPS = 30
 DEFAULT_GRANULARITY = 2
+
+TRANSFORM_ENGINES = ["loop", "numpy", "prefix", "lazy"]
+
+DEFAULT_CACHE_DIR = ".mazecache"
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
@@ -0,0 +1,197 @@
+# dstar.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the D* Lite planner, which keeps its search between plans and only
+repairs the part of it that a change of the maze affects.
+"""
+
+import heapq
+
+from transform import applyObstacleDiff, updateMazeObstacles
+
+INFINITY = float('inf')
+
+class DStarLite:
+    def __init__(self, maze):
+        """Initializes the planner for the given maze. It searches backward from all
+           objectives at once, so the distances it keeps are to the closest objective.
+
+            Args:
+                maze (Maze): maze with the state id interface of GridStateSpace
+        """
+        self.__maze = maze
+        self.__strides = maze.getStateOffsets()[::2]
+        self.__start = maze.getStartState()
+        self.__last = self.__start
+        self.__km = 0
+        self.__goals = set(maze.getObjectiveStates())
+
+        self.__g = {}
+        self.__rhs = {}
+        # open states with their current key, the heap can hold stale entries for a state
+        self.__open = {}
+        self.__frontier = []
+        for goal in self.__goals:
+            self.__rhs[goal] = 0
+            self.updateQueue(goal)
+
+    def getMaze(self):
+        return self.__maze
+
+    def getHeuristic(self, state):
+        # number of moves from the start to the state when there are no walls
+        distance = 0
+        start = self.__start
+        for stride in self.__strides:
+            i, state = divmod(state, stride)
+            j, start = divmod(start, stride)
+            distance += abs(i - j)
+        return distance
+
+    def calculateKey(self, state):
+        value = min(self.__g.get(state, INFINITY), self.__rhs.get(state, INFINITY))
+        return (value + self.getHeuristic(state) + self.__km, value)
+
+    def updateQueue(self, state):
+        # queues the state with its current key when its distance is not settled
+        if self.__g.get(state, INFINITY) != self.__rhs.get(state, INFINITY):
+            key = self.calculateKey(state)
+            self.__open[state] = key
+            heapq.heappush(self.__frontier, (key, state))
+        else:
+            self.__open.pop(state, None)
+
+    def updateRhs(self, state):
+        # looks one move ahead from the state for its distance to the closest objective
+        maze = self.__maze
+        if state in self.__goals:
+            self.__rhs[state] = 0
+        elif not maze.isFreeState(state):
+            self.__rhs[state] = INFINITY
+        else:
+            g = self.__g
+            self.__rhs[state] = min([g.get(neighbor, INFINITY) + 1 for neighbor in maze.getStateNeighbors(state)],
+                                    default=INFINITY)
+
+    def computeShortestPath(self):
+        # expands states until the start is settled and no open state can give it a
+        # shorter path. Returns the number of states expanded
+        maze = self.__maze
+        g = self.__g
+        rhs = self.__rhs
+        start = self.__start
+        numExplored = 0
+        while len(self.__frontier) > 0:
+            key, state = self.__frontier[0]
+            if self.__open.get(state) != key:
+                heapq.heappop(self.__frontier)
+                continue
+            if key >= self.calculateKey(start) and rhs.get(start, INFINITY) == g.get(start, INFINITY):
+                break
+
+            heapq.heappop(self.__frontier)
+            newKey = self.calculateKey(state)
+            if key < newKey:
+                # the start moved since the state was queued
+                self.__open[state] = newKey
+                heapq.heappush(self.__frontier, (newKey, state))
+                continue
+
+            del self.__open[state]
+            numExplored += 1
+            neighbors = maze.getStateNeighbors(state)
+            if g.get(state, INFINITY) > rhs[state]:
+                # the distance went down, the neighbors can only get shorter through it
+                cost = rhs[state] + 1
+                g[state] = rhs[state]
+                for neighbor in neighbors:
+                    if cost < rhs.get(neighbor, INFINITY):
+                        rhs[neighbor] = cost
+                        self.updateQueue(neighbor)
+            else:
+                # the distance went up, only the neighbors that went through it change
+                cost = g.get(state, INFINITY) + 1
+                g[state] = INFINITY
+                for neighbor in neighbors:
+                    if rhs.get(neighbor, INFINITY) == cost:
+                        self.updateRhs(neighbor)
+                        self.updateQueue(neighbor)
+                self.updateRhs(state)
+                self.updateQueue(state)
+        return numExplored
+
+    def computePath(self):
+        """Plans from the current start, reusing everything the last plan found.
+
+            Return:
+                (path, number of states explored) in the same format as search
+        """
+        numExplored = self.computeShortestPath()
+        return self.getPath(), numExplored
+
+    def getPath(self):
+        # follows the distances downhill from the start to the closest objective. Every step
+        # of a repaired plan goes to a closer state, so it takes at most g[start] steps. Stale
+        # distances, e.g. after moveStart or updateStates without computePath, give []
+        g = self.__g
+        state = self.__start
+        if g.get(state, INFINITY) == INFINITY:
+            return []
+        path = [state]
+        while state not in self.__goals:
+            neighbor = min(self.__maze.getStateNeighbors(state), key=lambda neighbor: g.get(neighbor, INFINITY),
+                           default=None)
+            if neighbor is None or g.get(neighbor, INFINITY) >= g[state] or len(path) > g[self.__start]:
+                return []
+            state = neighbor
+            path.append(state)
+        return [self.__maze.stateToPosition(position) for position in path]
+
+    def moveStart(self, position):
+        """Moves the start to the given position, e.g. after the arm followed part of the path
+        """
+        self.__start = self.__maze.positionToState(position)
+        self.__km += self.getHeuristic(self.__last)
+        self.__last = self.__start
+
+    def updateStates(self, states):
+        """Repairs the search after the given states of the maze changed between free, wall
+           and objective.
+        """
+        maze = self.__maze
+        goals = set(maze.getObjectiveStates())
+        changed = set(states) | (goals ^ self.__goals)
+        self.__goals = goals
+        for state in changed:
+            for neighbor in [state] + maze.getStateNeighbors(state):
+                self.updateRhs(neighbor)
+                self.updateQueue(neighbor)
+
+def replanAfterObstacleDiff(planner, arm, goals, obstacles, window, added=(), removed=(), moved=()):
+    """This function updates the maze of the planner for a change of the obstacles and
+       repairs the last plan.
+
+        Args:
+            planner (DStarLite): planner that planned on the maze before the change
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles before the change
+            window (tuple): (width, height) of the window
+            added (list): [(x, y, r)] of new obstacles
+            removed (list): [(x, y, r)] of obstacles that are gone
+            moved (list): [((x, y, r), (x, y, r))] of obstacles and where they moved to
+
+        Return:
+            (obstacles, path, number of states explored): obstacles after the change and
+                                                           the repaired plan
+    """
+    obstacles, changed = applyObstacleDiff(obstacles, added, removed, moved)
+    states = updateMazeObstacles(planner.getMaze(), arm, goals, obstacles, window, changed)
+    planner.updateStates(states)
+    path, numExplored = planner.computePath()
+    return obstacles, path, numExplored
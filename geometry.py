@@ -13,8 +13,13 @@ This file contains geometry functions that relate with Part1 in MP2.
 
 import math
 import numpy as np
+import stats
 from const import *
 
+# a link with fewer obstacles within its reach than this tests all of them instead of
+# looking them up in the grid
+MIN_OBSTACLES_FOR_GRID = 32
+
 def computeCoordinate(start, length, angle):
     """Compute the end cooridinate based on the given start position, length and angle.
 
@@ -35,7 +40,7 @@ def computeCoordinate(start, length, angle):
     return endX, endY
 
 def doesArmTouchObstacles(armPos, obstacles):
-    for arm in armPos:
+    for link, arm in enumerate(armPos):
         start, end = arm       
         startX, startY = start
         endX, endY = end
@@ -43,7 +48,11 @@ def doesArmTouchObstacles(armPos, obstacles):
         start = (startX, startY)
         end = (endX, endY)
 
-        for obstacle in obstacles:
+        candidates = obstacles
+        if isinstance(obstacles, ObstacleIndex):
+            candidates = obstacles.getCandidates(link, min(startX, endX), min(startY, endY),
+                                                 max(startX, endX), max(startY, endY))
+        for obstacle in candidates:
             x, y, r = obstacle
             center = (x, y)
 
@@ -54,6 +63,7 @@ def doesArmTouchObstacles(armPos, obstacles):
     return False
 
 def doesCircleLineCollide(start, end, center, radius):
+    stats.count("geometry.collisionTests")
     # creates vectors
     line = tuple(np.subtract(end, start))
     lineToCircle = tuple(np.subtract(start, center))
@@ -88,6 +98,7 @@ def doesArmTouchGoals(armEnd, goals):
         Return:
             True if touched. False it not.
     """
+    stats.count("geometry.goalTests", len(goals))
     for i in goals:
         if i[2] >= (math.sqrt(((armEnd[1] - i[1]) ** 2) + (armEnd[0] - i[0]) **2)):
             return True
@@ -117,3 +128,255 @@ def isArmWithinWindow(armPos, window):
         if endX < 0 or endY < 0 or startX > width or startY > height:
             return False
     return True
+
+
+def doesCircleLineCollideBatch(starts, ends, circles):
+    """Determine whether each of a batch of line segments touches any of the given circles.
+       This is the vectorized version of doesCircleLineCollide and uses the same test.
+
+        Args:
+            starts (ndarray): (..., 2) start positions of the segments
+            ends (ndarray): (..., 2) end positions of the segments
+            circles (list): x-, y- coordinate and radius of circles [(x, y, r)]
+
+        Return:
+            ndarray of booleans with the leading shape of starts. True if touched.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    result = np.zeros(starts.shape[:-1], dtype=bool)
+    if len(circles) == 0:
+        return result
+
+    circles = np.asarray(circles, dtype=np.float64)
+    stats.count("geometry.collisionTests", result.size * len(circles))
+    centerX = circles[:, 0]
+    centerY = circles[:, 1]
+    radius = circles[:, 2]
+
+    # one extra trailing axis so every segment is tested against every circle
+    startX = starts[..., 0, np.newaxis]
+    startY = starts[..., 1, np.newaxis]
+    lineX = ends[..., 0, np.newaxis] - startX
+    lineY = ends[..., 1, np.newaxis] - startY
+    toCircleX = startX - centerX
+    toCircleY = startY - centerY
+
+    a = lineX * lineX + lineY * lineY
+    b = 2 * (toCircleX * lineX + toCircleY * lineY)
+    c = (toCircleX * toCircleX + toCircleY * toCircleY) - (radius * radius)
+
+    discrim = (b * b) - (4 * a * c)
+    positive = discrim > 0
+    discrim = np.sqrt(np.where(positive, discrim, 0))
+    t1 = ((b * -1) - discrim) / (2 * a)
+    t2 = ((b * -1) + discrim) / (2 * a)
+
+    collision = positive & (((t1 >= 0) & (t1 <= 1)) | (t2 == 0))
+    return np.any(collision, axis=-1, out=result)
+
+def doesArmTouchObstaclesBatch(armPos, obstacles):
+    """Determine whether the given batch of arm configurations touch obstacles
+
+        Args:
+            armPos (ndarray): (N, links, 2, 2) start and end position of all arm links
+            obstacles (list): x-, y- coordinate and radius of obstacles [(x, y, r)]
+
+        Return:
+            ndarray of N booleans. True if touched. False if not.
+    """
+    if not isinstance(obstacles, ObstacleIndex):
+        touched = doesCircleLineCollideBatch(armPos[:, :, 0], armPos[:, :, 1], obstacles)
+        return np.any(touched, axis=1)
+
+    touched = np.zeros(armPos.shape[0], dtype=bool)
+    for link in range(armPos.shape[1]):
+        touched |= doesLinkTouchObstaclesBatch(armPos[:, link, 0], armPos[:, link, 1], obstacles, link)
+    return touched
+
+def doesLinkTouchObstaclesBatch(starts, ends, obstacles, link):
+    """Determine whether each of a batch of positions of one arm link touches obstacles.
+       With an ObstacleIndex the segments are grouped into tiles by their midpoint, and
+       every tile is only tested against the obstacles near the box around its segments.
+
+        Args:
+            starts (ndarray): (N, 2) start positions of the link
+            ends (ndarray): (N, 2) end positions of the link
+            obstacles (list): x-, y- coordinate and radius of obstacles [(x, y, r)], or
+                              the ObstacleIndex of the scene
+            link (int): index of the arm link
+
+        Return:
+            ndarray of N booleans. True if touched. False if not.
+    """
+    if not isinstance(obstacles, ObstacleIndex):
+        return doesCircleLineCollideBatch(starts, ends, obstacles)
+    obstacleIndex = obstacles
+    if not obstacleIndex.hasGrid(link):
+        return doesCircleLineCollideBatch(starts, ends, obstacleIndex.getLinkObstacles(link))
+
+    lows = np.minimum(starts, ends)
+    highs = np.maximum(starts, ends)
+
+    touched = np.zeros(starts.shape[0], dtype=bool)
+    tiles = np.floor((lows + highs) / (2 * obstacleIndex.getTileSize(link))).astype(np.int64)
+    tiles, inverse = np.unique(tiles, axis=0, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind='stable')
+    bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(tiles)))[:-1]
+    for members in np.split(order, bounds):
+        low = lows[members].min(axis=0)
+        high = highs[members].max(axis=0)
+        candidates = obstacleIndex.getCandidates(link, low[0], low[1], high[0], high[1])
+        if len(candidates):
+            touched[members] = doesCircleLineCollideBatch(starts[members], ends[members], candidates)
+    return touched
+
+def doesArmTouchGoalsBatch(armEnd, goals):
+    """Determine whether the given batch of arm ticks touch goals
+
+        Args:
+            armEnd (ndarray): (N, 2) arm tick positions
+            goals (list): x-, y- coordinate and radius of goals [(x, y, r)]
+
+        Return:
+            ndarray of N booleans. True if touched. False if not.
+    """
+    armEnd = np.asarray(armEnd, dtype=np.float64)
+    result = np.zeros(armEnd.shape[0], dtype=bool)
+    stats.count("geometry.goalTests", armEnd.shape[0] * len(goals))
+    for x, y, r in goals:
+        distance = np.sqrt(((armEnd[:, 1] - y) ** 2) + (armEnd[:, 0] - x) ** 2)
+        result |= r >= distance
+    return result
+
+def isArmWithinWindowBatch(armPos, window):
+    """Determine whether the given batch of arm configurations stay in the window
+
+        Args:
+            armPos (ndarray): (N, links, 2, 2) start and end position of all arm links
+            window (tuple): (width, height) of the window
+
+        Return:
+            ndarray of N booleans. True if all parts are in the window. False if not.
+    """
+    width, height = window
+    x = armPos[..., 0]
+    y = armPos[..., 1]
+    inside = (x >= 0) & (x <= width) & (y >= 0) & (y <= height)
+    return np.all(inside.reshape(inside.shape[0], -1), axis=1)
+
+def getArmCollisionMasks(armPos, goals, obstacles, window):
+    """Classify a batch of arm configurations the same way the transform does for a single one.
+       A configuration is a wall if it touches an obstacle, leaves the window, or passes
+       through a goal without ending in it. It is an objective if it is not a wall and
+       the arm tick touches a goal.
+
+        Args:
+            armPos (ndarray): (N, links, 2, 2) start and end position of all arm links
+            goals (list): x-, y- coordinate and radius of goals [(x, y, r)]
+            obstacles (list): x-, y- coordinate and radius of obstacles [(x, y, r)]
+            window (tuple): (width, height) of the window
+
+        Return:
+            (isWall, isObjective) ndarrays of N booleans.
+    """
+    armPos = np.asarray(armPos, dtype=np.float64)
+    isWall = doesArmTouchObstaclesBatch(armPos, obstacles)
+    isWall |= ~isArmWithinWindowBatch(armPos, window)
+
+    touchesGoal = doesArmTouchGoalsBatch(armPos[:, -1, 1], goals)
+    isWall |= ~touchesGoal & doesArmTouchObstaclesBatch(armPos, goals)
+
+    isObjective = touchesGoal & ~isWall
+    return isWall, isObjective
+
+def getLinkReachAnnuli(armLinkLengths):
+    """Compute the distances from the arm base that bound every point of each arm link,
+       whatever the joint angles are.
+
+        Args:
+            armLinkLengths (list): length of every arm link
+
+        Return:
+            list of (inner, outer) distances, one per link
+    """
+    annuli = []
+    for i, length in enumerate(armLinkLengths):
+        # the links before this one end anywhere from the difference of the longest one
+        # and the rest up to the sum of them, this link then adds its own length
+        longest = max(armLinkLengths[:i], default=0)
+        total = sum(armLinkLengths[:i])
+        inner = 0 if length > longest else max(0, 2 * longest - total - length)
+        annuli.append((inner, total + length))
+    return annuli
+
+class ObstacleIndex(list):
+    """List of the obstacles of a scene that also indexes them for one arm. Every link only
+       keeps the obstacles within its reach from the arm base, in a uniform grid over their
+       centers when there are many.
+
+       It can be passed anywhere a list of obstacles is expected. The obstacle tests
+       use the index to test every link against the obstacles near it only, which gives
+       the same results as testing all of them.
+    """
+
+    def __init__(self, obstacles, armBase, armLinkLengths):
+        list.__init__(self, obstacles)
+        baseX, baseY = armBase
+        # one more unit keeps rounding from dropping an obstacle the collision test would count
+        self.__margin = max([r for x, y, r in self], default=0) + 1
+        self.__cellSize = max(2 * self.__margin, min(armLinkLengths, default=1) / 4)
+        self.__tileSizes = [max(self.__cellSize, length) for length in armLinkLengths]
+
+        self.__linkObstacles = []
+        self.__linkGrids = []
+        for inner, outer in getLinkReachAnnuli(armLinkLengths):
+            obstacles = []
+            for x, y, r in self:
+                distance = math.sqrt((x - baseX) ** 2 + (y - baseY) ** 2)
+                if distance - r <= outer + 1 and distance + r >= inner - 1:
+                    obstacles.append((x, y, r))
+            self.__linkObstacles.append(obstacles)
+
+            grid = None
+            if len(obstacles) >= MIN_OBSTACLES_FOR_GRID:
+                grid = {}
+                for x, y, r in obstacles:
+                    cell = (int(math.floor(x / self.__cellSize)), int(math.floor(y / self.__cellSize)))
+                    grid.setdefault(cell, []).append((x, y, r))
+            self.__linkGrids.append(grid)
+
+    def getLinkObstacles(self, link):
+        # Returns the obstacles within the reach of the given link
+        return self.__linkObstacles[link]
+
+    def hasGrid(self, link):
+        return self.__linkGrids[link] is not None
+
+    def getTileSize(self, link):
+        # Returns the size of the tiles a batch of positions of the link is split into
+        return self.__tileSizes[link]
+
+    def getCandidates(self, link, minX, minY, maxX, maxY):
+        """Returns the obstacles the link can touch while it stays within the given box
+        """
+        grid = self.__linkGrids[link]
+        if grid is None:
+            return self.__linkObstacles[link]
+
+        size = self.__cellSize
+        lowX = int(math.floor((minX - self.__margin) / size))
+        lowY = int(math.floor((minY - self.__margin) / size))
+        highX = int(math.floor((maxX + self.__margin) / size))
+        highY = int(math.floor((maxY + self.__margin) / size))
+
+        candidates = []
+        if (highX - lowX + 1) * (highY - lowY + 1) > len(grid):
+            for (cellX, cellY), obstacles in grid.items():
+                if lowX <= cellX <= highX and lowY <= cellY <= highY:
+                    candidates.extend(obstacles)
+            return candidates
+        for cellX in range(lowX, highX + 1):
+            for cellY in range(lowY, highY + 1):
+                candidates.extend(grid.get((cellX, cellY), ()))
+        return candidates
@@ -0,0 +1,101 @@
+# hierarchical.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the coarse to fine planner. It plans on a maze with a coarse
+granularity first, then transforms only a corridor of cells around the coarse path
+at the target granularity and searches that.
+"""
+
+import numpy as np
+
+from maze import Maze
+from search import search
+from transform import transformToMaze, transformMaskedCells, getMazeShape
+from const import *
+
+def planCoarseToFine(arm, goals, obstacles, window, granularity, coarseGranularity,
+                     corridor=1, searchMethod="astar", maxWidenings=3):
+    """This function plans a path at the given granularity without transforming the whole map.
+
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): target unit of increasing/decreasing degree for angles
+            coarseGranularity (int): granularity of the first plan
+            corridor (int): number of coarse cells around the coarse path that are refined
+            searchMethod (str): search method used at both granularities
+            maxWidenings (int): number of times the corridor is doubled when the refined
+                                maze has no path, before the whole map is transformed
+
+        Return:
+            (path, number of states explored) in the same format as search, the states
+            explored by every search on the way count
+    """
+    coarsePath = []
+    totalExplored = 0
+    try:
+        coarseMaze = transformToMaze(arm, goals, obstacles, window, coarseGranularity, "numpy")
+        coarsePath, numExplored = search(coarseMaze, searchMethod)
+        totalExplored += numExplored
+    except SystemExit:
+        # the coarse maze can lose small goals entirely
+        pass
+
+    if coarsePath:
+        offsets, coarseShape = getMazeShape(arm, coarseGranularity)
+        coarseMask = np.zeros(coarseShape, dtype=bool)
+        for angles in coarsePath:
+            coarseMask[coarseMaze.positionToIndex(angles)] = True
+
+        for widening in range(maxWidenings + 1):
+            mask = getCorridorMask(arm, granularity, coarseGranularity, coarseMask, corridor)
+            map = transformMaskedCells(arm, goals, obstacles, window, granularity, mask)
+            if np.any(map == ord(OBJECTIVE_CHAR)):
+                path, numExplored = search(Maze(map, offsets, granularity), searchMethod)
+                totalExplored += numExplored
+                if path:
+                    return path, totalExplored
+            corridor *= 2
+
+    maze = transformToMaze(arm, goals, obstacles, window, granularity, "numpy")
+    path, numExplored = search(maze, searchMethod)
+    return path, totalExplored + numExplored
+
+def getCorridorMask(arm, granularity, coarseGranularity, coarseMask, corridor):
+    """This function returns the cells of the fine maze that lie within the given number
+       of coarse cells of the coarse path.
+
+        Args:
+            arm (Arm): arm instance
+            granularity (int): granularity of the fine maze
+            coarseGranularity (int): granularity of the coarse maze
+            coarseMask (ndarray): bool coarse grid, True on the coarse path
+            corridor (int): number of coarse cells around the path
+
+        Return:
+            ndarray: bool grid with the shape of the fine maze
+    """
+    # grows the path by one cell along every axis per step, so the corridor is a box
+    wide = coarseMask
+    for step in range(corridor):
+        for axis in range(wide.ndim):
+            layers = np.moveaxis(wide, axis, 0)
+            grown = layers.copy()
+            grown[1:] |= layers[:-1]
+            grown[:-1] |= layers[1:]
+            wide = np.moveaxis(grown, 0, axis)
+
+    # maps every fine cell to the coarse cell with the closest angle
+    offsets, shape = getMazeShape(arm, granularity)
+    coarseIndexes = []
+    for axis in range(len(shape)):
+        index = np.rint(np.arange(shape[axis]) * granularity / coarseGranularity).astype(int)
+        coarseIndexes.append(np.minimum(index, coarseMask.shape[axis] - 1))
+    return wide[np.ix_(*coarseIndexes)]
@@ -0,0 +1,207 @@
+# lazyMaze.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the LazyMaze class, which has the interface of the Maze class but
+only classifies a cell of the configuration space when a search first reaches it.
+"""
+
+import copy
+import numpy as np
+
+import stats
+from arm import computeArmGridJoints
+from geometry import doesArmTouchGoalsBatch
+from maze import Maze
+from stateSpace import GridStateSpace
+from transform import classifyArmAngles, getMazeShape, CELLS_PER_CHUNK
+from const import *
+from util import angleToIdx, idxToAngle
+
+# code of a cell that has not been classified yet, no maze character uses it
+UNKNOWN_CELL = 0
+
+# cells are classified in blocks of this many indexes per axis around the first one a
+# search reaches, since a single cell costs about as much as a whole block
+LAZY_BLOCK_SIZE = 8
+
+class LazyMaze(GridStateSpace):
+    def __init__(self, arm, goals, obstacles, window, granularity):
+        """Initializes the LazyMaze object. Only the start and the objectives are found up
+           front, every other cell is classified on its first use and remembered.
+
+            Args:
+                arm (Arm): arm instance
+                goals (list): [(x, y, r)] of goals
+                obstacles (list): [(x, y, r)] of obstacles
+                window (tuple): (width, height) of the window
+                granularity (int): unit of increasing and decreasing the joint angle
+        """
+        self.__arm = arm
+        self.__goals = goals
+        self.__obstacles = obstacles
+        self.__window = window
+
+        self.offsets, shape = getMazeShape(arm, granularity)
+        self.granularity = granularity
+        self.__dimensions = list(shape)
+
+        # padded with walls like the state space, so cells are indexed by state id
+        cells = np.full(self.getStateShape(), ord(WALL_CHAR), dtype=np.uint8)
+        cells[tuple(slice(1, -1) for size in shape)] = UNKNOWN_CELL
+        self.__cells = cells.ravel()
+        self.__cellsView = memoryview(self.__cells)
+
+        # the start is the cell of the arm angles, like the start of the engines
+        startIndexes = angleToIdx(arm.getArmAngle()[:len(shape)], self.offsets, granularity)
+        self.__start = idxToAngle(startIndexes, self.offsets, granularity)
+        self.__cells[self.positionToState(self.__start)] = ord(START_CHAR)
+        self.__objective = self.findObjectives()
+
+        if not self.__objective:
+            print("Maze has no objectives")
+            raise SystemExit
+
+    def findObjectives(self):
+        # Only the arm tick is tested against the goals for every cell, then the few cells
+        # it touches are classified fully since the arm can still hit an obstacle there
+        candidates = []
+        rowsPerChunk = max(1, CELLS_PER_CHUNK // int(np.prod(self.__dimensions[1:])))
+        for rowStart in range(0, self.__dimensions[ALPHA], rowsPerChunk):
+            rows = slice(rowStart, min(rowStart + rowsPerChunk, self.__dimensions[ALPHA]))
+            joints = computeArmGridJoints(self.__arm, self.granularity, rows)
+            touches = doesArmTouchGoalsBatch(joints[..., -1, :].reshape(-1, 2), self.__goals)
+            indexes = np.argwhere(touches.reshape(joints.shape[:-2]))
+            indexes[:, ALPHA] += rowStart
+            candidates.append(indexes)
+        candidates = np.concatenate(candidates)
+
+        states = [self.indexToState(index) for index in candidates.tolist()]
+        states = [state for state in states if self.__cells[state] == UNKNOWN_CELL]
+        self.classifyStates(states)
+        return [self.stateToPosition(state) for state in states if self.__cells[state] == ord(OBJECTIVE_CHAR)]
+
+    def classifyStates(self, states):
+        # Classifies the given unknown states in one batch and remembers the results
+        if len(states) == 0:
+            return
+        indexes = np.stack(np.unravel_index(states, self.getStateShape()), axis=-1) - 1
+        angles = indexes * self.granularity + np.asarray(self.offsets)
+        self.__cells[states] = classifyArmAngles(self.__arm, angles, self.__goals, self.__obstacles, self.__window)
+        stats.countCells("transform.cells", self.__cells[states])
+
+    def classifyBlock(self, state):
+        # Classifies the unknown states of the block that holds the given state
+        index = self.stateToIndex(state)
+        ranges = []
+        for i in range(len(index)):
+            low = (index[i] // LAZY_BLOCK_SIZE) * LAZY_BLOCK_SIZE
+            ranges.append(np.arange(low, min(low + LAZY_BLOCK_SIZE, self.__dimensions[i])))
+        indexes = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, len(index))
+
+        strides = np.array(self.getStateOffsets()[::2])
+        states = (indexes + 1) @ strides
+        self.classifyStates(states[self.__cells[states] == UNKNOWN_CELL])
+
+    def classifyAll(self):
+        # Classifies every cell that is still unknown
+        states = np.flatnonzero(self.__cells == UNKNOWN_CELL)
+        for chunkStart in range(0, len(states), CELLS_PER_CHUNK):
+            self.classifyStates(states[chunkStart:chunkStart + CELLS_PER_CHUNK])
+
+    def getNumClassified(self):
+        # Returns the number of cells of the maze that have been classified so far
+        return int(np.prod(self.__dimensions)) - int(np.count_nonzero(self.__cells == UNKNOWN_CELL))
+
+    def getCellState(self, state):
+        if self.__cellsView[state] == UNKNOWN_CELL:
+            self.classifyBlock(state)
+        return self.__cellsView[state]
+
+    def getChar(self, alpha, beta = 0, gamma = 0):
+        # Get character for the given alpha and beta position
+        position = (alpha, beta, gamma)[:len(self.offsets)]
+        return chr(self.getCellState(self.positionToState(position)))
+
+    def isWall(self, alpha, beta = 0, gamma = 0):
+        # Returns True if the given position is the location of a wall
+        return self.getChar(alpha, beta, gamma) == WALL_CHAR
+
+    def isObjective(self, alpha, beta = 0, gamma = 0):
+        # Returns True if the given position is the location of an objective
+        return self.getChar(alpha, beta, gamma) == OBJECTIVE_CHAR
+
+    def getStart(self):
+        return self.__start
+
+    def setStart(self, start):
+        self.__start = start
+
+    def getDimensions(self):
+        return self.__dimensions
+
+    def getObjectives(self):
+        return copy.deepcopy(self.__objective)
+
+    def setObjectives(self, objectives):
+        self.__objective = objectives
+        self.resetDistanceField()
+
+    def getMap(self):
+        # Returns the maze as a uint8 ndarray of character codes, every cell gets classified
+        self.classifyAll()
+        cells = self.__cells.reshape(self.getStateShape())
+        return cells[tuple(slice(1, -1) for size in self.__dimensions)]
+
+    def saveToFile(self, filename):
+        # Export the maze to the text file, every cell gets classified
+        return Maze(self.getMap(), self.offsets, self.granularity).saveToFile(filename)
+
+    def saveToBinaryFile(self, filename):
+        # Export the maze to the binary maze file, every cell gets classified
+        return Maze(self.getMap(), self.offsets, self.granularity).saveToBinaryFile(filename)
+
+    def isValidMove(self, alpha, beta = 0, gamma = 0):
+        # Check if the agent can move into a specific position
+        index = angleToIdx((alpha, beta, gamma)[:len(self.offsets)], self.offsets, self.granularity)
+        for i in range(len(index)):
+            if index[i] < 0 or index[i] >= self.__dimensions[i]:
+                return False
+        return self.getCellState(self.indexToState(index)) != ord(WALL_CHAR)
+
+    def getNeighbors(self, alpha, beta = 0, gamma = 0):
+        # Returns list of neighboring positions that can be moved to from the given position
+        if len(self.offsets) == 1 and isinstance(alpha, tuple):
+            alpha = alpha[0]
+        position = (alpha, beta, gamma)[:len(self.offsets)]
+        neighbors = self.getStateNeighbors(self.positionToState(position))
+        return [self.stateToPosition(state) for state in neighbors]
+
+    def getGridShape(self):
+        return tuple(self.__dimensions)
+
+    def getFreeGrid(self):
+        return self.getMap() != ord(WALL_CHAR)
+
+    def positionToIndex(self, position):
+        return angleToIdx(position, self.offsets, self.granularity)
+
+    def indexToPosition(self, index):
+        return idxToAngle(index, self.offsets, self.granularity)
+
+    def isFreeState(self, state):
+        return self.getCellState(state) != ord(WALL_CHAR)
+
+    def getStateNeighbors(self, state):
+        # Returns list of neighboring states that can be moved to, classifying the blocks
+        # of the ones that are still unknown
+        cells = self.__cellsView
+        neighbors = [state + offset for offset in self.getStateOffsets()]
+        for neighbor in neighbors:
+            if cells[neighbor] == UNKNOWN_CELL:
+                self.classifyBlock(neighbor)
+        return [neighbor for neighbor in neighbors if cells[neighbor] != ord(WALL_CHAR)]
@@ -13,15 +13,37 @@ a representation of the maze that is exposed through a simple interface.
 """
 
 import copy
+import struct
+import numpy as np
+import stats
 from const import *
-from util import *
+from util import angleToIdx, idxToAngle
+from stateSpace import GridStateSpace
 
-class Maze:
+# Binary maze file: a fixed size little-endian header followed by the raw uint8 cells
+# of the maze in alpha, beta, gamma order. The header is the magic, version, number of
+# dimensions, byte offset of the cells and granularity, then per dimension the offset
+# angle, the size and the start index.
+MAZE_FILE_MAGIC = b"CSPC"
+MAZE_FILE_VERSION = 1
+MAZE_FILE_HEADER = "<4sHHIi"
+MAZE_FILE_HEADER_SIZE = 64
+
+# Text maze file: a header line with the offsets, granularity and dimensions of the maze,
+# then one line of maze characters per beta, gamma pair, each line running along alpha
+MAZE_TEXT_HEADER = "# offsets=%s granularity=%d dimensions=%s\n"
+
+# number of bytes saveToFile writes at once, bounds the copy of the cells it makes
+SAVE_CHUNK_BYTES = 1 << 20
+
+class Maze(GridStateSpace):
     def __init__(self, input_map, offsets, granularity):
         """Initializes the Maze object by reading the maze from a file
 
             Args:
-                input_map (list): 2D array. Alpha is row and beta is column
+                input_map (list or ndarray): 1D, 2D or 3D array of maze characters. Alpha is the
+                                             first axis, then beta and gamma. Either nested lists
+                                             of characters or a uint8 ndarray of character codes
                 offsets (list): min value of alpha and beta
                 granularity (int): unit of increasing and decreasing the joint angle
         """
@@ -31,36 +53,18 @@ class Maze:
         self.offsets = offsets
         self.granularity = granularity
 
-        if len(self.offsets) == 3:
-            self.__dimensions = [len(input_map), len(input_map[0]), len(input_map[0][0])]
-            self.__map = input_map
-
-            for x in range(self.__dimensions[ALPHA]):
-                for y in range(self.__dimensions[BETA]):
-                    for z in range(self.__dimensions[GAMMA]):
-                        if self.__map[x][y][z] == START_CHAR:
-                            self.__start = idxToAngle((x, y, z), self.offsets, granularity)
-                        elif self.__map[x][y][z] == OBJECTIVE_CHAR:
-                            self.__objective.append(idxToAngle((x, y, z), self.offsets, granularity))
-        elif len(self.offsets) == 2:
-            self.__dimensions = [len(input_map), len(input_map[0])]        
+        if isinstance(input_map, np.ndarray) and input_map.dtype == np.uint8:
             self.__map = input_map
-
-            for x in range(self.__dimensions[ALPHA]):
-                for y in range(self.__dimensions[BETA]):                
-                    if self.__map[x][y] == START_CHAR:                    
-                        self.__start = idxToAngle((x, y), self.offsets, granularity)
-                    elif self.__map[x][y] == OBJECTIVE_CHAR:
-                        self.__objective.append(idxToAngle((x, y), self.offsets, granularity))
         else:
-            self.__dimensions = [len(input_map)]        
-            self.__map = input_map
+            self.__map = np.array(input_map, dtype='S1').view(np.uint8)
+        self.__dimensions = list(self.__map.shape)
 
-            for x in range(self.__dimensions[ALPHA]):
-                if self.__map[x] == START_CHAR:                    
-                        self.__start = idxToAngle((x,), self.offsets, granularity)
-                elif self.__map[x] == OBJECTIVE_CHAR:
-                        self.__objective.append(idxToAngle((x,), self.offsets, granularity))
+        with stats.timePhase("maze.findStartAndObjectives"):
+            starts = np.argwhere(self.__map == ord(START_CHAR))
+            if len(starts):
+                self.__start = idxToAngle(starts[-1], self.offsets, granularity)
+
+            self.__objective = self.findObjectives()
 
         if not self.__start:
             print("Maze has no start")
@@ -70,18 +74,16 @@ class Maze:
             print("Maze has no objectives")
             raise SystemExit
 
+    def findObjectives(self):
+        # argwhere lists cells in the same alpha, beta, gamma order as a scan of the map
+        objectives = np.argwhere(self.__map == ord(OBJECTIVE_CHAR))
+        objectives = objectives * self.granularity + np.asarray(self.offsets)
+        return [tuple(objective) for objective in objectives.astype(int).tolist()]
+
     def getChar(self, alpha, beta = 0, gamma = 0):
         # Get character for the given alpha and beta position
-
-        if len(self.offsets) == 3:
-            x, y, z = angleToIdx((alpha, beta, gamma), self.offsets, self.granularity)
-            return self.__map[x][y][z]
-        elif len(self.offsets) == 2:
-            x, y = angleToIdx((alpha, beta), self.offsets, self.granularity)
-            return self.__map[x][y]
-        else:
-            x = angleToIdx((alpha,), self.offsets, self.granularity)[0]
-        return self.__map[x]
+        index = angleToIdx((alpha, beta, gamma)[:len(self.offsets)], self.offsets, self.granularity)
+        return chr(self.__map[index])
 
     def isWall(self, alpha, beta = 0, gamma = 0):
         # Returns True if the given position is the location of a wall
@@ -99,6 +101,44 @@ class Maze:
         # Set the start position as a tuple of (beta, column)
         self.__start = start
 
+    def getMap(self):
+        # Returns the maze as a uint8 ndarray of character codes, alpha is the first axis
+        return self.__map
+
+    def setCells(self, indexes, cells):
+        """Changes the given cells of the maze in place. The objectives and the free states
+           follow the new characters.
+
+            Args:
+                indexes (ndarray): (N, dimensions) array indexes of the cells
+                cells (ndarray): N maze characters as uint8 codes
+        """
+        indexes = np.asarray(indexes, dtype=int).reshape(-1, len(self.__dimensions))
+        cells = np.asarray(cells, dtype=np.uint8)
+        index = tuple(indexes.T)
+        changesObjectives = np.any(self.__map[index] == ord(OBJECTIVE_CHAR)) or \
+                            np.any(cells == ord(OBJECTIVE_CHAR))
+        self.__map[index] = cells
+        stats.count("maze.cellsChanged", len(cells))
+
+        if changesObjectives:
+            self.setObjectives(self.findObjectives())
+        states = np.ravel_multi_index(tuple(indexes.T + 1), self.getStateShape())
+        self.setFreeStates(states, cells != ord(WALL_CHAR))
+
+    def getGridShape(self):
+        return tuple(self.__dimensions)
+
+    def getFreeGrid(self):
+        # Returns a bool ndarray that is True for every cell that is not a wall
+        return self.__map != ord(WALL_CHAR)
+
+    def positionToIndex(self, position):
+        return angleToIdx(position, self.offsets, self.granularity)
+
+    def indexToPosition(self, index):
+        return idxToAngle(index, self.offsets, self.granularity)
+
     def getDimensions(self):
         # Returns the dimensions of the maze as a (row, column) tuple
         return self.__dimensions
@@ -110,6 +150,7 @@ class Maze:
     def setObjectives(self, objectives):
         # Set the list of objective positions of the maze
         self.__objective = objectives
+        self.resetDistanceField()
 
     def isValidMove(self, alpha, beta = 0, gamma = 0):
         # Check if the agent can move into a specific beta and column
@@ -145,6 +186,7 @@ class Maze:
             for a, b, c in possibleNeighbors:
                 if self.isValidMove(a,b,c):
                     neighbors.append((a,b,c))
+            stats.count("maze.neighbors", len(neighbors))
             return neighbors
         elif len(self.offsets) == 2:
             possibleNeighbors = [
@@ -157,6 +199,7 @@ class Maze:
             for a, b in possibleNeighbors:
                 if self.isValidMove(a,b):
                     neighbors.append((a,b))
+            stats.count("maze.neighbors", len(neighbors))
             return neighbors
         else:
             possibleNeighbors = [
@@ -167,36 +210,118 @@ class Maze:
             for a in possibleNeighbors:
                 if self.isValidMove(a):
                     neighbors.append((a,))
+        stats.count("maze.neighbors", len(neighbors))
         return neighbors
 
     def saveToFile(self, filename):
-        # Export the maze to the text file
-        outputMap = ""
+        # Export the maze to the text file that loadFromFile reads back, a block of gamma
+        # slices at a time so the whole text is never held in memory
         print("saving file")
-        if len(self.offsets) == 3:
-            for gamma in range(self.__dimensions[2]):
-                for beta in range(self.__dimensions[1]):
-                    for alpha in range(self.__dimensions[0]):
-                        outputMap += self.__map[alpha][beta][gamma]
-                    outputMap += "\n"
-            with open(filename, 'w') as f:
-                f.write(outputMap)
+        header = MAZE_TEXT_HEADER % (",".join(str(offset) for offset in self.offsets), self.granularity,
+                                     ",".join(str(size) for size in self.__dimensions))
 
-        elif len(self.offsets) == 2:
-            print("saving file for 2")
-            for beta in range(self.__dimensions[1]):
-                for alpha in range(self.__dimensions[0]):
-                    outputMap += self.__map[alpha][beta]
-                outputMap += "\n"
-            with open(filename, 'w') as f:
-                f.write(outputMap)
+        # the reversed axes make every line a run of alpha, the lines go through beta and
+        # then gamma. The cells are viewed as (gamma, beta, alpha) for any number of links
+        cells = self.__map.transpose()
+        while cells.ndim < 3:
+            cells = cells[np.newaxis]
+        lineLength = self.__dimensions[ALPHA] + 1
+        slicesPerWrite = max(1, SAVE_CHUNK_BYTES // (cells.shape[1] * lineLength))
 
-        else:
-            for alpha in range(self.__dimensions[0]):
-                outputMap += self.__map[alpha]
-            outputMap += "\n"
+        with open(filename, 'wb') as f:
+            f.write(header.encode())
+            for sliceStart in range(0, cells.shape[0], slicesPerWrite):
+                slices = cells[sliceStart:sliceStart + slicesPerWrite]
+                lines = np.empty(slices.shape[:-1] + (lineLength,), dtype=np.uint8)
+                lines[..., :-1] = slices
+                lines[..., -1] = ord("\n")
+                f.write(lines.tobytes())
+
+        return True
 
-            with open(filename, 'w') as f:
-                f.write(outputMap)
+    def saveToBinaryFile(self, filename):
+        # Export the maze to the binary maze file format that loadFromBinaryFile maps back in
+        numDimensions = len(self.__dimensions)
+        startIndexes = angleToIdx(self.__start, self.offsets, self.granularity)
+        header = struct.pack(MAZE_FILE_HEADER, MAZE_FILE_MAGIC, MAZE_FILE_VERSION, numDimensions,
+                             MAZE_FILE_HEADER_SIZE, self.granularity)
+        header += struct.pack("<%di" % numDimensions, *self.offsets)
+        header += struct.pack("<%dI" % numDimensions, *self.__dimensions)
+        header += struct.pack("<%di" % numDimensions, *startIndexes)
+
+        with open(filename, 'wb') as f:
+            f.write(header.ljust(MAZE_FILE_HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(self.__map).tobytes())
 
         return True
+
+def loadFromFile(filename):
+    """Reads a text maze file written by saveToFile back into a Maze.
+
+        Args:
+            filename (str): path to the text maze file
+
+        Return:
+            Maze: the maze stored in the file
+    """
+    with open(filename, 'rb') as f:
+        header = f.readline().decode()
+        data = np.fromfile(f, dtype=np.uint8)
+
+    fields = dict(field.split("=", 1) for field in header.lstrip("#").split() if "=" in field)
+    if not header.startswith("#") or any(key not in fields for key in ("offsets", "granularity", "dimensions")):
+        print("Maze file has no header")
+        raise SystemExit
+    offsets = tuple(int(offset) for offset in fields["offsets"].split(","))
+    granularity = int(fields["granularity"])
+    dimensions = tuple(int(size) for size in fields["dimensions"].split(","))
+
+    # the lines hold the reversed axes, every line ends with its newline
+    shape = tuple(reversed(dimensions[1:])) + (dimensions[ALPHA] + 1,)
+    if len(offsets) != len(dimensions) or data.size != np.prod(shape) or \
+       np.any(data.reshape(shape)[..., -1] != ord("\n")):
+        print("Maze dimensions incorrect")
+        raise SystemExit
+    map = np.ascontiguousarray(data.reshape(shape)[..., :-1].transpose())
+    return Maze(map, offsets, granularity)
+
+def isBinaryMazeFile(filename):
+    # Returns True if the file starts like a binary maze file of saveToBinaryFile
+    with open(filename, 'rb') as f:
+        return f.read(len(MAZE_FILE_MAGIC)) == MAZE_FILE_MAGIC
+
+def loadFromBinaryFile(filename, mode='c'):
+    """Opens a binary maze file written by saveToBinaryFile. The cells are memory mapped,
+       so processes that open the same file share its pages and nothing is parsed or copied.
+       By default they are copy on write, so setCells only copies the pages it changes and
+       the file itself never changes.
+
+        Args:
+            filename (str): path to the binary maze file
+            mode (str): np.memmap mode, 'c' for copy on write, 'r' for read only
+
+        Return:
+            Maze: the maze stored in the file
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(MAZE_FILE_HEADER_SIZE)
+
+    if len(header) < MAZE_FILE_HEADER_SIZE:
+        print("Maze file is too short")
+        raise SystemExit
+    magic, version, numDimensions, dataOffset, granularity = struct.unpack_from(MAZE_FILE_HEADER, header)
+    if magic != MAZE_FILE_MAGIC or version != MAZE_FILE_VERSION:
+        print("Maze file has unknown format")
+        raise SystemExit
+
+    position = struct.calcsize(MAZE_FILE_HEADER)
+    offsets = struct.unpack_from("<%di" % numDimensions, header, position)
+    position += 4 * numDimensions
+    dimensions = struct.unpack_from("<%dI" % numDimensions, header, position)
+    position += 4 * numDimensions
+    startIndexes = struct.unpack_from("<%di" % numDimensions, header, position)
+
+    map = np.memmap(filename, dtype=np.uint8, mode=mode, offset=dataOffset, shape=dimensions)
+    maze = Maze(map, offsets, granularity)
+    maze.setStart(idxToAngle(startIndexes, offsets, granularity))
+    return maze
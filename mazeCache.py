@@ -0,0 +1,199 @@
+# mazeCache.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the on-disk cache of transformed mazes. A maze is stored under a
+hash of everything the transform depends on, so a later run with the same scene and
+granularity loads it instead of transforming the map again.
+"""
+
+import argparse
+import configparser
+import hashlib
+import os
+import zipfile
+import zlib
+import numpy as np
+
+from arm import Arm
+from maze import Maze
+from transform import transformToMaze
+from const import *
+from util import loadMapConfig
+
+# bump when the transform changes the mazes it builds, so old entries are not used
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".npz"
+
+def getSceneKey(arm, goals, obstacles, window, granularity):
+    """Returns the hash of everything the transform depends on
+
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
+
+        Return:
+            str: hex digest that names the cache entry
+    """
+    scene = (
+        CACHE_VERSION,
+        tuple(arm.getBase()),
+        tuple(arm.getArmLinkLengths()),
+        tuple(arm.getArmAngle()),
+        tuple(tuple(limit) for limit in arm.getArmLimit()),
+        tuple(window),
+        tuple(tuple(goal) for goal in goals),
+        tuple(tuple(obstacle) for obstacle in obstacles),
+        granularity,
+    )
+    return hashlib.sha256(repr(scene).encode()).hexdigest()
+
+def getCachePath(cacheDir, key):
+    return os.path.join(cacheDir, key + CACHE_SUFFIX)
+
+def loadCachedMaze(cacheDir, key):
+    """Returns the cached maze with the given key, or None if it is not cached.
+       A hit marks the entry as the most recently used one. A damaged entry is a miss and
+       is removed, so the maze is stored again.
+    """
+    path = getCachePath(cacheDir, key)
+    try:
+        with np.load(path) as data:
+            map = data["map"]
+            offsets = tuple(data["offsets"].tolist())
+            granularity = data["granularity"].item()
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile, zlib.error):
+        removeCacheFile(path)
+        return None
+
+    os.utime(path)
+    return Maze(map, offsets, granularity)
+
+def storeCachedMaze(cacheDir, key, maze, maxBytes=DEFAULT_CACHE_SIZE):
+    """Stores the maze under the given key, then evicts the least recently used entries
+       until the cache fits in maxBytes
+    """
+    os.makedirs(cacheDir, exist_ok=True)
+    path = getCachePath(cacheDir, key)
+    # writes to a temporary file first so other processes never load half a file
+    temporaryPath = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(temporaryPath, "wb") as f:
+            np.savez_compressed(f, map=maze.getMap(), offsets=np.array(maze.offsets),
+                                granularity=np.array(maze.granularity))
+        os.replace(temporaryPath, path)
+    finally:
+        # only left when writing failed
+        removeCacheFile(temporaryPath)
+    evictCache(cacheDir, maxBytes)
+
+def removeCacheFile(path):
+    # Removes the file if it is there, another process may have removed it already
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def evictCache(cacheDir, maxBytes):
+    """Removes the least recently used entries until the cache fits in maxBytes
+    """
+    entries = []
+    for name in os.listdir(cacheDir):
+        if not name.endswith(CACHE_SUFFIX):
+            continue
+        try:
+            stat = os.stat(os.path.join(cacheDir, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+
+    totalBytes = sum(size for mtime, size, name in entries)
+    for mtime, size, name in sorted(entries):
+        if totalBytes <= maxBytes:
+            break
+        try:
+            os.remove(os.path.join(cacheDir, name))
+        except OSError:
+            continue
+        totalBytes -= size
+
+def transformToMazeCached(arm, goals, obstacles, window, granularity, engine="numpy", workers=1,
+                          cacheDir=DEFAULT_CACHE_DIR, maxBytes=DEFAULT_CACHE_SIZE):
+    """This function returns the maze of transformToMaze, loading it from the cache when the
+       same scene was transformed before and storing it otherwise.
+
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
+            engine (str): transform engine used on a miss
+            workers (int): number of transform processes used on a miss
+            cacheDir (str): directory of the cache
+            maxBytes (int): size bound of the cache directory
+
+        Return:
+            Maze: the maze instance generated based on input arguments.
+    """
+    key = getSceneKey(arm, goals, obstacles, window, granularity)
+    maze = loadCachedMaze(cacheDir, key)
+    if maze is None:
+        maze = transformToMaze(arm, goals, obstacles, window, granularity, engine, workers)
+        storeCachedMaze(cacheDir, key, maze, maxBytes)
+    return maze
+
+def prewarmCache(configFile, granularities, engine="numpy", workers=1,
+                 cacheDir=DEFAULT_CACHE_DIR, maxBytes=DEFAULT_CACHE_SIZE):
+    """Transforms every map section of the config file at the given granularities into the cache
+    """
+    config = configparser.ConfigParser()
+    config.read(configFile)
+    for map_name in config.sections():
+        window, armBase, armLinks, obstacles, goals = loadMapConfig(config, map_name)
+        for granularity in granularities:
+            try:
+                transformToMazeCached(Arm(armBase, armLinks), goals, obstacles, window, granularity,
+                                      engine, workers, cacheDir, maxBytes)
+                print("Cached %s at granularity %d" % (map_name, granularity))
+            except SystemExit:
+                print("Skipped %s at granularity %d" % (map_name, granularity))
+
+    # a smaller size bound than last time applies even when every entry was a hit
+    if os.path.isdir(cacheDir):
+        evictCache(cacheDir, maxBytes)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='CS440 MP2 Maze Cache')
+
+    parser.add_argument('--prewarm', default = False, action = "store_true",
+                        help='transform every map section into the cache')
+    parser.add_argument('--config', dest="config", type=str, default = CONFIG_FILE,
+                        help='configuration filename - default '+CONFIG_FILE)
+    parser.add_argument('--granularity', dest="granularity", type=int, nargs='+', default = [DEFAULT_GRANULARITY],
+                        help='degree granularities to prewarm - default '+str(DEFAULT_GRANULARITY))
+    parser.add_argument('--cache-dir', dest="cacheDir", type=str, default = DEFAULT_CACHE_DIR,
+                        help='cache directory - default '+DEFAULT_CACHE_DIR)
+    parser.add_argument('--cache-size', dest="cacheSize", type=int, default = DEFAULT_CACHE_SIZE,
+                        help='size bound of the cache in bytes - default '+str(DEFAULT_CACHE_SIZE))
+    parser.add_argument('--engine', dest="engine", type=str, default = "numpy",
+                        choices = TRANSFORM_ENGINES,
+                        help='engine that transforms the map to the maze - default numpy')
+    parser.add_argument('--workers', dest="workers", type=int, default = 1,
+                        help='number of processes that transform the map - default 1')
+
+    args = parser.parse_args()
+    if args.prewarm:
+        prewarmCache(args.config, args.granularity, args.engine, args.workers, args.cacheDir, args.cacheSize)
+    else:
+        parser.print_help()
@@ -12,10 +12,19 @@ This file contains the Maze class, which reads in a maze file and creates
 a representation of the maze that is exposed through a simple interface.
 """
 
-import re
-import copy
+import numpy as np
+from stateSpace import GridStateSpace
 
-class MazeMP1:
+# byte code that ends a line of a maze file, and the bytes of the blank lines that are skipped
+NEWLINE = ord('\n')
+BLANK_BYTES = b" \t\r\n\x0b\x0c"
+IS_BLANK_BYTE = np.zeros(256, dtype=bool)
+IS_BLANK_BYTE[list(BLANK_BYTES)] = True
+
+# lines starting with this byte are comments, like the header line of Maze.saveToFile
+COMMENT_BYTE = b'#'
+
+class MazeMP1(GridStateSpace):
     # Initializes the Maze object by reading the maze from a file
     def __init__(self, filename):
         self.__filename = filename
@@ -25,35 +34,36 @@ class MazeMP1:
         self.__start = None
         self.__objective = []
 
-        with open(filename) as f:
-            lines = f.readlines()
-
-        lines = list(filter(lambda x: not re.match(r'^\s*$', x), lines))
-        lines = [list(line.strip('\n')) for line in lines]
+        with open(filename, 'rb') as f:
+            data = f.read()
 
-        self.rows = len(lines)
-        self.cols = len(lines[0])
-        self.mazeRaw = lines
-
-        if (len(self.mazeRaw) != self.rows) or (len(self.mazeRaw[0]) != self.cols):
+        self.__map = parseMazeBytes(data)
+        if self.__map is None:
             print("Maze dimensions incorrect")
             raise SystemExit
-            return
-
-        for row in range(len(self.mazeRaw)):
-            for col in range(len(self.mazeRaw[0])):
-                if self.mazeRaw[row][col] == self.__startChar:
-                    self.__start = (row, col)
-                elif self.mazeRaw[row][col] == self.__objectiveChar:
-                    self.__objective.append((row, col))
+        self.rows, self.cols = self.__map.shape
+        # memoryview indexing is much cheaper than ndarray indexing for single cells
+        self.__cells = memoryview(self.__map)
+
+        # argwhere lists cells in the same row by row order as a scan of the maze, and
+        # the last start of the scan is the start
+        starts = np.argwhere(self.__map == ord(self.__startChar))
+        if len(starts):
+            self.__start = tuple(starts[-1].tolist())
+        self.setObjectives([tuple(index) for index in np.argwhere(self.__map == ord(self.__objectiveChar)).tolist()])
+
+    # Returns the maze as a list of rows, each a list of characters, built from the grid on every access
+    @property
+    def mazeRaw(self):
+        return [list(row.tobytes().decode()) for row in self.__map]
 
     # Returns True if the given position is the location of a wall
     def isWall(self, row, col):
-        return self.mazeRaw[row][col] == self.__wallChar
+        return self.__cells[row, col] == ord(self.__wallChar)
 
     # Rturns True if the given position is the location of an objective
     def isObjective(self, row, col):
-        return (row, col) in self.__objective
+        return (row, col) in self.__objectiveSet
 
     # Returns the start position as a tuple of (row, column)
     def getStart(self):
@@ -68,10 +78,25 @@ class MazeMP1:
 
     # Returns the list of objective positions of the maze
     def getObjectives(self):
-        return copy.deepcopy(self.__objective)
+        return list(self.__objective)
 
     def setObjectives(self, objectives):
         self.__objective = objectives
+        self.__objectiveSet = set(tuple(objective) for objective in objectives)
+        self.resetDistanceField()
+
+    def getGridShape(self):
+        return (self.rows, self.cols)
+
+    # Returns a bool ndarray that is True for every cell that is not a wall
+    def getFreeGrid(self):
+        return self.__map != ord(self.__wallChar)
+
+    def positionToIndex(self, position):
+        return tuple(position)
+
+    def indexToPosition(self, index):
+        return tuple(index)
 
     # Check if the agent can move into a specific row and column
     def isValidMove(self, row, col):
@@ -89,4 +114,36 @@ class MazeMP1:
         for r, c in possibleNeighbors:
             if self.isValidMove(r,c):
                 neighbors.append((r,c))
-        return neighbors
\ No newline at end of file
+        return neighbors
+
+def parseMazeBytes(data):
+    """Parses the bytes of a maze file into a 2D uint8 grid of character codes. Blank lines
+       and lines starting with # like the header of saveToFile are skipped, every other
+       line is a row of the maze.
+
+        Args:
+            data (bytes): contents of the maze file
+
+        Return:
+            ndarray: (rows, cols) uint8 character codes, None if the rows differ in length
+    """
+    while data.startswith(COMMENT_BYTE):
+        data = data[data.find(b'\n') + 1:] if b'\n' in data else b''
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    cols = data.find(b'\n')
+    if cols < 0:
+        cols = len(data)
+    # the common file of equal rows that each end with a newline is reshaped in place, the
+    # newlines are the last column. Other files are split into lines
+    if cols > 0 and len(data) % (cols + 1) == 0 and data[cols - 1:cols] != b'\r':
+        grid = buffer.reshape(-1, cols + 1)
+        if np.all(grid[:, cols] == NEWLINE) and np.all(np.any(~IS_BLANK_BYTE[grid[:, :cols]], axis=1)) and \
+           not np.any(grid[:, 0] == ord(COMMENT_BYTE)):
+            return np.ascontiguousarray(grid[:, :cols])
+
+    lines = [line.rstrip(b'\r') for line in data.split(b'\n')
+             if line.strip(BLANK_BYTES) and not line.startswith(COMMENT_BYTE)]
+    if len(lines) == 0 or any(len(line) != len(lines[0]) for line in lines):
+        return None
+    return np.frombuffer(b''.join(lines), dtype=np.uint8).reshape(len(lines), len(lines[0])).copy()
+
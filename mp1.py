@@ -18,6 +18,7 @@ import sys
 import argparse
 import time
 
+import stats
 from pygame.locals import *
 from agent import Agent
 from mazeMP1 import MazeMP1
@@ -74,6 +75,8 @@ class Application:
             print("Results")
             print("Path Length:", len(path))
             print("States Explored:", statesExplored)
+            if stats.isEnabled():
+                print(stats.formatStats(stats.getStats()))
             self.drawPath(path)
             
         self.drawMaze()
@@ -175,7 +178,7 @@ if __name__ == "__main__":
     parser.add_argument('filename',
                         help='path to maze file [REQUIRED]')
     parser.add_argument('--method', dest="search", type=str, default = "bfs", 
-                        choices = ["bfs", "dfs", "greedy", "astar", "astarEC"],
+                        choices = ["bfs", "dfs", "greedy", "astar", "astarEC", "astarfield", "descent", "bidirectional", "jps"],
                         help='search method - default bfs')
     parser.add_argument('--scale', dest="scale", type=int, default = 20,
                         help='scale - default: 20')
@@ -185,8 +188,12 @@ if __name__ == "__main__":
                         help='flag for human playable - default False')
     parser.add_argument('--save', dest="save", type=str, default = None, 
                         help='save output to image file - default not saved')
+    parser.add_argument('--stats', default = False, action = "store_true",
+                        help='count collision tests, neighbors and heap operations and time each phase - default False')
     
 
     args = parser.parse_args()
+    if args.stats:
+        stats.enable()
     app = Application(args.human, args.scale, args.fps)
     app.execute(args.filename, args.search, args.save)
@@ -11,19 +11,24 @@
 This file contains the main application that is run for this MP.
 """
 
-import pygame
 import sys
 import argparse
 import configparser
 import copy
+import json
+import time
 
-from pygame.locals import *
+import stats
 from arm import Arm
-from transform import transformToMaze
-from search import search
+from search import search, SEARCH_METHODS
 from const import *
-from util import *
-from geometry import *
+from util import isValueInBetween, loadMapConfig
+from geometry import doesArmTouchObstacles, doesArmTouchGoals, isArmWithinWindow
+
+def importPygame():
+    # pygame is only imported once a window is opened, so headless runs never load it
+    global pygame
+    import pygame
 
 class Application:
 
@@ -34,36 +39,45 @@ class Application:
         self.config.read(CONFIG_FILE)
         self.fps = fps
         self.__human = human
-        self.clock = pygame.time.Clock()   
+        self.clock = None
         self.trajectory = []   
 
         # Parse config file
         self.windowTitle = "CS440 MP2 Robotic Arm"
-        self.window = eval(self.config.get(map_name, 'Window'))
+        self.window, armBase, armLinks, self.obstacles, self.goals = loadMapConfig(self.config, map_name)
 
-        armBase = eval(self.config.get(map_name, 'ArmBase'))
-        armLinks = eval(self.config.get(map_name, 'ArmLinks'))
         self.armLimits = [(0, 0), (0, 0), (0, 0)]
         for i in range(len(armLinks)):
             self.armLimits[i] = armLinks[i][-1]
         self.arm = Arm(armBase, armLinks)
 
-        self.obstacles = eval(self.config.get(map_name, 'Obstacles'))
-        self.goals = eval(self.config.get(map_name, 'Goals'))
-
 
     # Initializes the pygame context and certain properties of the maze
     def initialize(self):
         
+        importPygame()
         pygame.init()
+        self.clock = pygame.time.Clock()
         self.displaySurface = pygame.display.set_mode((self.window[0], self.window[1]), pygame.HWSURFACE)
         self.displaySurface.fill(WHITE)
         pygame.display.flip()
         pygame.display.set_caption(self.windowTitle)
+
+        # the trajectory layer is the background with every footprint drawn so far, and the
+        # scene layer holds the obstacles and goals that are drawn over the arm. Both are
+        # drawn once, a frame only copies the area the arm moved through from them
+        self.trajectorySurface = pygame.Surface((self.window[0], self.window[1])).convert()
+        self.trajectorySurface.fill(WHITE)
+        self.sceneSurface = pygame.Surface((self.window[0], self.window[1]), pygame.SRCALPHA).convert_alpha()
+        self.sceneSurface.fill((0, 0, 0, 0))
+        self.drawObstacles(self.sceneSurface)
+        self.drawGoal(self.sceneSurface)
+        self.armRect = None
+        self.dirtyRects = []
         self.running = True
 
     # Once the application is initiated, execute is in charge of drawing the game and dealing with the game loop
-    def execute(self, searchMethod, granularity, trajectory, saveImage, saveMaze):        
+    def execute(self, searchMethod, granularity, trajectory, saveImage, saveMaze, engine="loop", workers=1, cacheDir=None, loadMaze=None, saveMazeBinary=None):        
         self.initialize()
         if not self.running:
             print("Program init failed")
@@ -76,14 +90,19 @@ class Application:
 
         if not self.__human:
             print("Transforming a map configuration to a maze...")
-            maze = transformToMaze(self.arm, self.goals, self.obstacles, self.window, granularity)
+            maze = self.buildMaze(granularity, engine, workers, cacheDir, loadMaze)
             print("Done!")
             print("Searching the path...")
             path, num_explored = search(maze, searchMethod)            
+            if stats.isEnabled():
+                print(stats.formatStats(stats.getStats()))
+            # every footprint is drawn once, in the shade it has once the whole path is shown
+            numFootprints = len(range(0, len(path), trajectory)) if trajectory > 0 else 0
             for i in range(len(path)):
                 self.arm.setArmAngle(path[i])
                 if (trajectory > 0) and (i % trajectory == 0):
                     self.trajectory.append(self.arm.getArmPos())
+                    self.drawTrajectory(self.trajectory[-1], len(self.trajectory), numFootprints)
                 self.gameLoop()
             print("Done!")
 
@@ -91,27 +110,27 @@ class Application:
             pygame.event.pump()            
             keys = pygame.key.get_pressed()
                         
-            if (keys[K_ESCAPE]):
+            if (keys[pygame.K_ESCAPE]):
                 self.running = False                
 
             if self.__human:                
                 alpha, beta, gamma = currAngle                
-                if (keys[K_z]):                    
+                if (keys[pygame.K_z]):                    
                     alpha += granularity if isValueInBetween(self.armLimits[ALPHA], alpha+granularity) else 0
 
-                if (keys[K_x]):                    
+                if (keys[pygame.K_x]):                    
                     alpha -= granularity if isValueInBetween(self.armLimits[ALPHA], alpha-granularity) else 0
 
-                if (keys[K_a]):                    
+                if (keys[pygame.K_a]):                    
                     beta += granularity if isValueInBetween(self.armLimits[BETA], beta+granularity) else 0
 
-                if (keys[K_s]):                    
+                if (keys[pygame.K_s]):                    
                     beta -= granularity if isValueInBetween(self.armLimits[BETA], beta-granularity) else 0
 
-                if (keys[K_q]):                    
+                if (keys[pygame.K_q]):                    
                     gamma += granularity if isValueInBetween(self.armLimits[GAMMA], gamma+granularity) else 0
 
-                if (keys[K_w]):                    
+                if (keys[pygame.K_w]):                    
                     gamma -= granularity if isValueInBetween(self.armLimits[GAMMA], gamma-granularity) else 0
 
                 newAngle = (alpha, beta, gamma)                
@@ -141,42 +160,99 @@ class Application:
 
         if saveMaze and not self.__human:
             maze.saveToFile(saveMaze)
+
+        if saveMazeBinary and not self.__human:
+            maze.saveToBinaryFile(saveMazeBinary)
             
 
+    def executeHeadless(self, searchMethod, granularity, saveMaze, engine="loop", workers=1, cacheDir=None, loadMaze=None, saveMazeBinary=None, output=None):
+        # plans without a window, then prints the path, the number of explored states and
+        # the timings, and writes them as JSON to output if given
+        startTime = time.perf_counter()
+        maze = self.buildMaze(granularity, engine, workers, cacheDir, loadMaze)
+        transformTime = time.perf_counter() - startTime
+
+        startTime = time.perf_counter()
+        path, num_explored = search(maze, searchMethod)
+        searchTime = time.perf_counter() - startTime
+
+        print("Transform time: %.4f s" % (transformTime))
+        print("Search time: %.4f s" % (searchTime))
+        print("Number of states explored: %d" % (num_explored))
+        print("Path length: %d" % (len(path)))
+        print("Path: %s" % (path))
+        if stats.isEnabled():
+            print(stats.formatStats(stats.getStats()))
+
+        if output:
+            result = {"granularity": granularity, "method": searchMethod, "path": [list(angles) for angles in path],
+                      "explored": num_explored, "transformTime": transformTime, "searchTime": searchTime}
+            if stats.isEnabled():
+                result["stats"] = stats.getStats()
+            with open(output, "w") as f:
+                json.dump(result, f, indent=2)
+
+        if saveMaze:
+            maze.saveToFile(saveMaze)
+
+        if saveMazeBinary:
+            maze.saveToBinaryFile(saveMazeBinary)
+
+    def buildMaze(self, granularity, engine="loop", workers=1, cacheDir=None, loadMaze=None):
+        # transforms the map to the maze, only importing the modules the chosen way needs
+        if loadMaze:
+            from maze import isBinaryMazeFile, loadFromBinaryFile, loadFromFile
+            if isBinaryMazeFile(loadMaze):
+                return loadFromBinaryFile(loadMaze)
+            return loadFromFile(loadMaze)
+        if cacheDir:
+            from mazeCache import transformToMazeCached
+            return transformToMazeCached(self.arm, self.goals, self.obstacles, self.window, granularity, engine, workers, cacheDir)
+        from transform import transformToMaze
+        return transformToMaze(self.arm, self.goals, self.obstacles, self.window, granularity, engine, workers)
+
     def gameLoop(self):
+        # only redraws the area of the last arm, the new arm and the new footprints
         self.clock.tick(self.fps)
-        self.displaySurface.fill(WHITE)
-        self.drawTrajectory()
-        self.drawArm()
-        self.drawObstacles()
-        self.drawGoal()
-        pygame.display.flip()
+        if self.armRect is None:
+            dirty = self.displaySurface.get_rect()
+        else:
+            dirty = self.armRect.unionall(self.dirtyRects)
+        self.dirtyRects = []
+
+        self.displaySurface.blit(self.trajectorySurface, dirty, dirty)
+        self.armRect = self.drawArm()
+        dirty.union_ip(self.armRect)
+        self.displaySurface.blit(self.sceneSurface, dirty, dirty)
+        pygame.display.update(dirty)
       
 
-    def drawTrajectory(self):
-        cnt = 1
-        for armPos in self.trajectory:
-            x = (255 - 255/len(self.trajectory)*cnt)
-            color = (x, x, x)
-            cnt += 1
-            for i in range(len(armPos)):
-                pygame.draw.line(self.displaySurface, color, armPos[i][0], armPos[i][1], ARM_LINKS_WIDTH[i])  
+    def drawTrajectory(self, armPos, count, numFootprints):
+        # draws the footprint onto the trajectory layer, the later ones are darker
+        x = (255 - 255/numFootprints*count)
+        color = (x, x, x)
+        for i in range(len(armPos)):
+            rect = pygame.draw.line(self.trajectorySurface, color, armPos[i][0], armPos[i][1], ARM_LINKS_WIDTH[i])  
+            self.dirtyRects.append(rect)
 
 
     def drawArm(self):
+        # returns the area the arm was drawn in
         armPos = self.arm.getArmPos()
+        rects = []
         for i in range(len(armPos)):
-            pygame.draw.line(self.displaySurface, BLACK, armPos[i][0], armPos[i][1], ARM_LINKS_WIDTH[i])  
+            rects.append(pygame.draw.line(self.displaySurface, BLACK, armPos[i][0], armPos[i][1], ARM_LINKS_WIDTH[i]))
+        return rects[0].unionall(rects[1:])
 
 
-    def drawObstacles(self):
+    def drawObstacles(self, surface):
         for obstacle in self.obstacles:
-            pygame.draw.circle(self.displaySurface, RED, (obstacle[0], obstacle[1]), obstacle[2])
+            pygame.draw.circle(surface, RED, (obstacle[0], obstacle[1]), obstacle[2])
 
 
-    def drawGoal(self):
+    def drawGoal(self, surface):
         for goal in self.goals:
-            pygame.draw.circle(self.displaySurface, BLUE, (goal[0], goal[1]), goal[2])
+            pygame.draw.circle(surface, BLUE, (goal[0], goal[1]), goal[2])
 
 
 
@@ -187,7 +263,7 @@ if __name__ == "__main__":
     parser.add_argument('--map', dest="map_name", type=str, default = "BasicMap",
                         help='configuration filename - default BasicMap')
     parser.add_argument('--method', dest="search", type=str, default = "astar", 
-                        choices = ["bfs", "dfs", "greedy", "astar"],
+                        choices = SEARCH_METHODS,
                         help='search method - default bfs')
     parser.add_argument('--human', default = False, action = "store_true",
                         help='flag for human playable - default False')
@@ -201,7 +277,32 @@ if __name__ == "__main__":
                         help='save output to image file - default not saved')
     parser.add_argument('--save-maze', dest="saveMaze", type=str, default = None, 
                         help='save the contructed maze to maze file - default not saved')
+    parser.add_argument('--engine', dest="engine", type=str, default = "loop",
+                        choices = TRANSFORM_ENGINES,
+                        help='engine that transforms the map to the maze - default loop')
+    parser.add_argument('--workers', dest="workers", type=int, default = 1,
+                        help='number of processes that transform the map - default 1')
+    parser.add_argument('--cache-dir', dest="cacheDir", type=str, default = None,
+                        help='load and store transformed mazes in this directory - default no cache')
+    parser.add_argument('--load-maze', dest="loadMaze", type=str, default = None,
+                        help='use the maze of a binary or text maze file instead of transforming the map - default not loaded')
+    parser.add_argument('--save-maze-binary', dest="saveMazeBinary", type=str, default = None,
+                        help='save the contructed maze to binary maze file - default not saved')
+    parser.add_argument('--headless', default = False, action = "store_true",
+                        help='plan without a window and print the path, explored states and timings - default False')
+    parser.add_argument('--output', dest="output", type=str, default = None,
+                        help='with --headless, write the path, explored states and timings as JSON to this file - default not written')
+    parser.add_argument('--stats', default = False, action = "store_true",
+                        help='count collision tests, cells, neighbors and heap operations and time each phase - default False')
     
     args = parser.parse_args()
+    if args.stats:
+        stats.enable()
     app = Application(args.map_name, args.human, args.fps)
-    app.execute(args.search, args.granularity, args.trajectory, args.saveImage, args.saveMaze)
\ No newline at end of file
+    if args.headless:
+        if args.human:
+            print("Human play needs a window, --headless can not be used with --human")
+            raise SystemExit
+        app.executeHeadless(args.search, args.granularity, args.saveMaze, args.engine, args.workers, args.cacheDir, args.loadMaze, args.saveMazeBinary, args.output)
+        sys.exit(0)
+    app.execute(args.search, args.granularity, args.trajectory, args.saveImage, args.saveMaze, args.engine, args.workers, args.cacheDir, args.loadMaze, args.saveMazeBinary)
\ No newline at end of file
@@ -0,0 +1,154 @@
+# planner.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the batch planner, which transforms the map of a scene once and
+then answers many (start, goals) queries on that maze without any window.
+"""
+
+import multiprocessing
+import numpy as np
+
+import stats
+from arm import computeArmJointsBatch
+from geometry import doesArmTouchGoalsBatch
+from transform import transformToMaze
+from mazeCache import transformToMazeCached
+from search import search
+
+# number of chunks of queries every worker of the pool gets on average
+CHUNKS_PER_WORKER = 4
+
+# maze and objectives of the worker processes, set once per process by initPlanWorker
+workerState = {}
+
+class BatchPlanner:
+    def __init__(self, arm, goals, obstacles, window, granularity, engine="numpy", cacheDir=None):
+        """Initializes the planner by transforming the map of the scene to a maze once.
+
+            Args:
+                arm (Arm): arm instance
+                goals (list): [(x, y, r)] of goals
+                obstacles (list): [(x, y, r)] of obstacles
+                window (tuple): (width, height) of the window
+                granularity (int): unit of increasing/decreasing degree for angles
+                engine (str): transform engine
+                cacheDir (str): directory of the maze cache, None to always transform
+        """
+        if cacheDir:
+            self.__maze = transformToMazeCached(arm, goals, obstacles, window, granularity, engine,
+                                                cacheDir=cacheDir)
+        else:
+            self.__maze = transformToMaze(arm, goals, obstacles, window, granularity, engine)
+        self.__goalObjectives = getGoalObjectives(arm, goals, self.__maze)
+
+    def getMaze(self):
+        return self.__maze
+
+    def getGoalObjectives(self):
+        # Returns the list of objective positions of every goal
+        return self.__goalObjectives
+
+    def planBatch(self, queries, searchMethod="astar", workers=1):
+        """Plans every query on the maze of the scene.
+
+            Args:
+                queries (list): [(start, goalIndexes)] where start is the (alpha, beta, gamma)
+                                of the arm and goalIndexes lists the goals the arm should
+                                reach, or is None for all of them
+                searchMethod (str): search method
+                workers (int): number of processes that share the queries, 1 to plan in
+                               this process
+
+            Return:
+                list of (path, number of states explored), in the order of the queries
+        """
+        # queries with the same goals go together, so the maze changes its objectives once
+        # per set of goals, and descent and astarfield only compute one distance field per set
+        order = sorted(range(len(queries)), key=lambda i: getGoalKey(queries[i][1]))
+        tasks = [(queries[i], searchMethod) for i in order]
+
+        if workers > 1:
+            chunkSize = max(1, len(tasks) // (workers * CHUNKS_PER_WORKER))
+            initArgs = (self.__maze, self.__goalObjectives, stats.isEnabled())
+            with multiprocessing.Pool(workers, initPlanWorker, initArgs) as pool:
+                counted = pool.map(planQueryTaskCounted, tasks, chunkSize)
+            planned = []
+            for result, taskStats in counted:
+                planned.append(result)
+                if taskStats is not None:
+                    stats.mergeStats(taskStats)
+        else:
+            maze = self.__maze
+            start, objectives = maze.getStart(), maze.getObjectives()
+            initPlanWorker(maze, self.__goalObjectives)
+            planned = [planQueryTask(task) for task in tasks]
+            maze.setStart(start)
+            maze.setObjectives(objectives)
+
+        results = [None] * len(queries)
+        for i, result in zip(order, planned):
+            results[i] = result
+        return results
+
+def getGoalObjectives(arm, goals, maze):
+    """Returns the objective positions of the maze that every goal makes, one list per goal.
+       An objective is in the list of every goal its arm tick touches.
+    """
+    objectives = maze.getObjectives()
+    if len(objectives) == 0:
+        return [[] for goal in goals]
+    angles = np.array(objectives).reshape(len(objectives), -1)
+    armEnds = computeArmJointsBatch(arm.getBase(), arm.getArmLinkLengths(), angles)[:, -1]
+    goalObjectives = []
+    for goal in goals:
+        touches = doesArmTouchGoalsBatch(armEnds, [goal])
+        goalObjectives.append([objective for objective, touch in zip(objectives, touches) if touch])
+    return goalObjectives
+
+def getGoalKey(goalIndexes):
+    # sort key of the goals of a query, all goals sort first
+    if goalIndexes is None:
+        return (0, ())
+    return (1, tuple(sorted(goalIndexes)))
+
+def initPlanWorker(maze, goalObjectives, countStats=False):
+    # keeps the maze of the scene in the process, so the queries do not carry it
+    workerState["countStats"] = countStats
+    workerState["maze"] = maze
+    workerState["goalObjectives"] = goalObjectives
+    workerState["objectives"] = maze.getObjectives()
+    workerState["goalKey"] = getGoalKey(None)
+    workerState["numObjectives"] = len(workerState["objectives"])
+
+def planQueryTask(task):
+    # plans one query on the maze of the process
+    (start, goalIndexes), searchMethod = task
+    maze = workerState["maze"]
+
+    goalKey = getGoalKey(goalIndexes)
+    if goalKey != workerState["goalKey"]:
+        if goalIndexes is None:
+            objectives = workerState["objectives"]
+        else:
+            objectives = set()
+            for i in goalIndexes:
+                objectives.update(workerState["goalObjectives"][i])
+            objectives = sorted(objectives)
+        maze.setObjectives(objectives)
+        workerState["goalKey"] = goalKey
+        workerState["numObjectives"] = len(objectives)
+
+    start = tuple(start)
+    if workerState["numObjectives"] == 0 or not maze.isValidMove(*start):
+        return [], 0
+    maze.setStart(start)
+    return search(maze, searchMethod)
+
+def planQueryTaskCounted(task):
+    # plans one query in a worker of the pool, with the stats of the worker when the parent counts them
+    return stats.callCounted(workerState["countStats"], planQueryTask, task)
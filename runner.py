@@ -0,0 +1,144 @@
+# runner.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the headless batch runner. It transforms every map section of the
+config file at every granularity, runs the search methods on the mazes in parallel
+processes, and writes a JSON or CSV report. It never opens a window.
+"""
+
+import argparse
+import configparser
+import csv
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+from arm import Arm
+from transform import transformToMaze
+from search import search, SEARCH_METHODS
+from const import *
+from util import loadMapConfig
+
+REPORT_FIELDS = ["map", "granularity", "method", "engine", "status", "cells", "transformTime",
+                 "searchTime", "pathLength", "explored", "peakMemoryMB"]
+
+def getPeakMemoryMB():
+    # Returns the peak resident memory of this process
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak / 1024
+
+def runJob(job):
+    """Transforms one map at one granularity and runs every search method on the maze.
+
+        Args:
+            job (tuple): (config file, map name, granularity, engine, search methods)
+
+        Return:
+            list of report rows, one per search method
+    """
+    configFile, map_name, granularity, engine, searchMethods = job
+    config = configparser.ConfigParser()
+    config.read(configFile)
+    window, armBase, armLinks, obstacles, goals = loadMapConfig(config, map_name)
+
+    rows = []
+    startTime = time.perf_counter()
+    try:
+        maze = transformToMaze(Arm(armBase, armLinks), goals, obstacles, window, granularity, engine)
+    except SystemExit:
+        maze = None
+    transformTime = time.perf_counter() - startTime
+
+    for searchMethod in searchMethods:
+        row = {"map": map_name, "granularity": granularity, "method": searchMethod, "engine": engine,
+               "status": "ok", "cells": 0, "transformTime": transformTime, "searchTime": 0.0,
+               "pathLength": 0, "explored": 0}
+        if maze is None:
+            row["status"] = "no maze"
+        else:
+            cells = 1
+            for size in maze.getDimensions():
+                cells *= size
+            startTime = time.perf_counter()
+            path, numExplored = search(maze, searchMethod)
+            row["searchTime"] = time.perf_counter() - startTime
+            row.update(cells=cells, pathLength=len(path), explored=numExplored)
+            if not path:
+                row["status"] = "no path"
+        rows.append(row)
+
+    # every job runs in its own process, so the peak is the peak of this job
+    peakMemory = getPeakMemoryMB()
+    for row in rows:
+        row["peakMemoryMB"] = peakMemory
+    return rows
+
+def runAll(configFile, maps, granularities, searchMethods, engine="numpy", workers=1):
+    """Runs every map at every granularity, one process per (map, granularity) at a time
+       for each of the given number of workers.
+
+        Return:
+            list of report rows in the order of the maps, granularities and methods
+    """
+    if not maps:
+        config = configparser.ConfigParser()
+        config.read(configFile)
+        maps = config.sections()
+
+    jobs = [(configFile, map_name, granularity, engine, searchMethods)
+            for map_name in maps for granularity in granularities]
+    # a fresh process per job keeps the peak memory of one job from showing up in the next
+    with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+        results = pool.map(runJob, jobs, 1)
+    return [row for rows in results for row in rows]
+
+def writeReport(rows, filename):
+    # Writes the rows as CSV if the filename ends with .csv, as JSON otherwise
+    with open(filename, "w", newline="") as f:
+        if filename.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='CS440 MP2 Headless Runner')
+
+    parser.add_argument('--config', dest="config", type=str, default = CONFIG_FILE,
+                        help='configuration filename - default '+CONFIG_FILE)
+    parser.add_argument('--maps', dest="maps", type=str, nargs='+', default = None,
+                        help='map sections to run - default all sections')
+    parser.add_argument('--method', dest="search", type=str, nargs='+', default = ["astar"],
+                        choices = SEARCH_METHODS,
+                        help='search methods - default astar')
+    parser.add_argument('--granularity', dest="granularity", type=int, nargs='+', default = [DEFAULT_GRANULARITY],
+                        help='degree granularities to run - default '+str(DEFAULT_GRANULARITY))
+    parser.add_argument('--engine', dest="engine", type=str, default = "numpy",
+                        choices = TRANSFORM_ENGINES,
+                        help='engine that transforms the map to the maze - default numpy')
+    parser.add_argument('--workers', dest="workers", type=int, default = multiprocessing.cpu_count(),
+                        help='number of processes - default number of cpus')
+    parser.add_argument('--output', dest="output", type=str, default = "report.json",
+                        help='report filename, .csv for CSV and JSON otherwise - default report.json')
+
+    args = parser.parse_args()
+    rows = runAll(args.config, args.maps, args.granularity, args.search, args.engine, args.workers)
+    writeReport(rows, args.output)
+
+    print("%-10s %5s %-13s %-8s %10s %10s %8s %10s %8s" % ("map", "gran", "method", "status", "transform", "search", "path", "explored", "peakMB"))
+    for row in rows:
+        print("%-10s %5d %-13s %-8s %10.4f %10.4f %8d %10d %8.1f" % (row["map"], row["granularity"], row["method"], row["status"],
+              row["transformTime"], row["searchTime"], row["pathLength"], row["explored"], row["peakMemoryMB"]))
+    print("Report written to %s" % (args.output))
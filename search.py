@@ -11,6 +11,12 @@
 This file contains search functions.
 """
 import heapq
+import numpy as np
+import stats
+from util import manhattanDistanceTransform
+
+# above this number of goals the heuristic is precomputed for the whole maze
+MAX_GOALS_FOR_DIRECT_HEURISTIC = 16
 
 # Search should return the path and the number of states explored.
 # The path should be a list of tuples in the form (alpha, beta, gamma) that correspond
@@ -21,12 +27,22 @@ import heapq
 # You may need to slight change your previous search functions in MP1 since this is 3-d maze
 
 def search(maze, searchMethod):
-    return {
-        "bfs": bfs,
-        "dfs": dfs,
-        "greedy": greedy,
-        "astar": astar,
-    }.get(searchMethod, [])(maze)
+    with stats.timePhase("search." + str(searchMethod)):
+        path, numExplored = {
+            "bfs": bfs,
+            "dfs": dfs,
+            "greedy": greedy,
+            "astar": astar,
+            "astarfield": astarfield,
+            "descent": descent,
+            "bidirectional": bidirectional,
+            "jps": jps,
+        }.get(searchMethod, [])(maze)
+    stats.count("search.explored", numExplored)
+    stats.count("search.pathLength", len(path))
+    return path, numExplored
+
+SEARCH_METHODS = ["bfs", "dfs", "greedy", "astar", "astarfield", "descent", "bidirectional", "jps"]
 
 def bfs(maze):
     # TODO: Write your code here    
@@ -40,130 +56,308 @@ def greedy(maze):
     # TODO: Write your code here    
     return [], 0
 
-def astar(maze):
-    start = maze.getStart()
-    goals = set(maze.getObjectives())
-    numArms = len(start)
+def astar(maze, exactHeuristic=False):
+    # runs on the integer state ids of the maze and keeps the best known path cost of
+    # every state. The heap can hold stale entries for a state, they are skipped when popped.
+    # With exactHeuristic the distance field of the maze is the heuristic, and the states
+    # its search expands count as explored on the call that builds it
+    start = maze.getStartState()
+    goals = set(maze.getObjectiveStates())
+    numFieldExplored = 0
+    if exactHeuristic:
+        # an exact heuristic only expands states on a shortest path
+        heuristic, numFieldExplored = get_distance_heuristic(maze)
+    else:
+        heuristic = get_manhattan_heuristic(maze, goals)
     frontier = []
     explored = set([])
-    costLookUp = {}
-
-    startNode = NodeAstar(None, start, 0, 0, goals)
-    
-    costLookUp[startNode.state] = 0
-    heapq.heappush(frontier, startNode)
-    
-    currentNode = None
-    
+    costLookUp = {start: 0}
+    parents = {start: None}
+
+    # counted in locals and recorded once, so the loop does not call into stats
+    numPushes, numNeighbors, numReopens = 1, 0, 0
+
+    # ties on total cost go to the deeper state, then to the smaller state id
+    heapq.heappush(frontier, (heuristic(start), 0, start))
+
     while (len(frontier) > 0):
-        currentNode = heapq.heappop(frontier)
-        explored.add(currentNode)
-
-        if(currentNode.is_goal()):
-            break
-
-        neighbors = None
-        if(numArms == 1):
-            alpha = currentNode.state
-            neighbors = maze.getNeighbors(alpha)
-        elif(numArms == 2):
-            alpha, beta = (currentNode.state)
-            neighbors = maze.getNeighbors(alpha, beta)
-        elif(numArms == 3):
-            alpha, beta, gamma = (currentNode.state)
-            neighbors = maze.getNeighbors(alpha, beta, gamma)
-        
+        total_cost, path_cost, state = heapq.heappop(frontier)
+        path_cost = -path_cost
+        if state in explored or path_cost > costLookUp[state]:
+            continue
+        explored.add(state)
+
+        if state in goals:
+            record_search(numPushes, numPushes - len(frontier), numNeighbors, numReopens)
+            with stats.timePhase("search.path"):
+                path = [maze.stateToPosition(position) for position in get_solution(parents, state)]
+            return path, len(explored) + numFieldExplored
+
+        neighbors = maze.getStateNeighbors(state)
+        numNeighbors += len(neighbors)
         for neighbor in neighbors:
-            node = currentNode.add_child(neighbor)
-            if node not in explored and node not in frontier:
-                heapq.heappush(frontier, node)
-                costLookUp[node.state] = node.total_cost
-            else:
-               # adds state back in again this new path was cheaper
-                currentCost = node.total_cost
-                oldCost = costLookUp[node.state]
-                if(currentCost < oldCost):
-                    costLookUp[node.state] = currentCost
-                    if node in explored:
-                        explored.remove(node)
-                        frontier.append(node)
-                    else:
-                        frontier.append(node)
-    # only returns the path cost, which is needed for precomputations
-    path = currentNode.get_solution()
-    return path, len(explored)
-
-class NodeAstar:
-    ### only works for start position to goal position
-    ### state is the current position as tuple (row, col)
-    ### path cost is path cost from start to this state
-    def __init__(self, parent, state, path_cost, estimated_cost, goals):
-        self.parent = parent
-        self.state = state
-        self.goals = goals
-        self.path_cost = path_cost
-        self.estimated_cost = estimated_cost
-        self.total_cost = self.path_cost + self.estimated_cost
-    
-    def is_goal(self):
-        return self.state in self.goals
-
-    def add_child(self, postion):
-        state = postion
-        path_cost = self.path_cost + 1
-        estimated_cost = self.get_estimated_cost()
-        node = NodeAstar(self, state, path_cost, estimated_cost, self.goals)
-        return node
-    
-    def get_estimated_cost(self):
-        distances = []
-        start = self.state
-        for goal in self.goals:
-            distance = self.get_manhattan_distance(start, goal)
-            distances.append(distance)
-        distances.sort(reverse=True)
-
-        min_dist = distances.pop()
-        return min_dist
-
-    def get_manhattan_distance(self, start, end):
-        if(len(start) == 1):
-            return start[0] - end[0]
-        if(len(start) == 2):
-            delta_row = start[0] - end[0]
-            delta_col = start[1] - end[1]
-            distance = abs(delta_row) + abs(delta_col)
-            return distance
+            cost = path_cost + 1
+            if cost < costLookUp.get(neighbor, cost + 1):
+                costLookUp[neighbor] = cost
+                parents[neighbor] = state
+                # reopens the state since this new path was cheaper
+                if neighbor in explored:
+                    explored.remove(neighbor)
+                    numReopens += 1
+                heapq.heappush(frontier, (cost + heuristic(neighbor), -cost, neighbor))
+                numPushes += 1
+
+    # no objective can be reached from the start
+    record_search(numPushes, numPushes, numNeighbors, numReopens)
+    return [], len(explored) + numFieldExplored
+
+def astarfield(maze):
+    # astar with the cached distance field of the maze as an exact heuristic
+    return astar(maze, exactHeuristic=True)
+
+def jps(maze, exactHeuristic=False):
+    # jump point search on the 4 and 6 connected grids. Straight runs of states with no
+    # reason to turn are skipped, so only the states where a shortest path may turn go on
+    # the heap. The path between two jump points is a straight run along one axis
+    start = maze.getStartState()
+    goals = set(maze.getObjectiveStates())
+    numFieldExplored = 0
+    if exactHeuristic:
+        heuristic, numFieldExplored = get_distance_heuristic(maze)
+    else:
+        heuristic = get_manhattan_heuristic(maze, goals)
+    offsets = maze.getStateOffsets()
+    axes = range(len(offsets) // 2)
+    isFree = maze.isFreeState
+
+    # the jump point found from a state in a direction never changes during the search,
+    # and every state of a run shares it, so the runs are only walked once
+    jumpPoints = dict((step, {}) for step in offsets)
+
+    def jump(state, axis, step):
+        # walks from the state along the axis and returns the first jump point, or None
+        # when a wall comes first
+        known = jumpPoints[step]
+        if state in known:
+            return known[state]
+        run = []
+        while True:
+            run.append(state)
+            state += step
+            if not isFree(state):
+                jumpPoint = None
+                break
+            if state in goals or isJumpPoint(state, axis, step):
+                jumpPoint = state
+                break
+            if state in known:
+                jumpPoint = known[state]
+                break
+        for position in run:
+            known[position] = jumpPoint
+        return jumpPoint
+
+    def isJumpPoint(state, axis, step):
+        # a run along an axis searches every lower axis from each of its states, and stops
+        # where a higher axis has a neighbor that can not be reached around this state
+        for other in axes:
+            if other == axis:
+                continue
+            for side in (offsets[2 * other], offsets[2 * other + 1]):
+                if other < axis:
+                    if jump(state, other, side) is not None:
+                        return True
+                elif isFree(state + side) and not isFree(state - step + side):
+                    return True
+        return False
+
+    frontier = []
+    explored = set([])
+    costLookUp = {start: 0}
+    parents = {start: None}
+    directions = {start: None}
+    numPushes, numNeighbors, numReopens = 1, 0, 0
+    heapq.heappush(frontier, (heuristic(start), 0, start))
+
+    while (len(frontier) > 0):
+        total_cost, path_cost, state = heapq.heappop(frontier)
+        path_cost = -path_cost
+        if state in explored or path_cost > costLookUp[state]:
+            continue
+        explored.add(state)
+
+        if state in goals:
+            record_search(numPushes, numPushes - len(frontier), numNeighbors, numReopens)
+            with stats.timePhase("search.path"):
+                path = get_jump_solution(maze, parents, directions, state)
+            return path, len(explored) + numFieldExplored
+
+        # the start looks in every direction, a jump point keeps going and turns to the sides
+        if directions[state] is None:
+            successors = [(axis, offsets[2 * axis + side]) for axis in axes for side in (0, 1)]
         else:
-            delta_row = start[0] - end[0]
-            delta_col = start[1] - end[1]
-            delta_depth = start[2] - end[2]
-            distance = abs(delta_row) + abs(delta_col) + abs(delta_depth)
-            return distance
-
-    def get_solution(self):
-        current_node = self
-        path = []
-        current_position = current_node.state
-        
-        # stops at start node which has parent set to None
-        while not (current_node.parent is None):
-            path.append(current_position)
-            current_node = current_node.parent
-            current_position = current_node.state
-        # appends the starts node position
-        path.append(current_position)
-        
-        path.reverse()
-        return path
-
-    def __lt__(self, other):
-        if(self.total_cost == other.total_cost):
-            return self.path_cost > other.path_cost
-        return self.total_cost < other.total_cost
-
-    def __eq__(self, other):
-        return self.state == other.state
-
-    def __hash__(self):
-        return hash(self.state)
\ No newline at end of file
+            forward = directions[state]
+            successors = [forward] + [(axis, offsets[2 * axis + side]) for axis in axes
+                                      for side in (0, 1) if axis != forward[0]]
+
+        for axis, step in successors:
+            jumpPoint = jump(state, axis, step)
+            if jumpPoint is None:
+                continue
+            numNeighbors += 1
+            cost = path_cost + (jumpPoint - state) // step
+            if cost < costLookUp.get(jumpPoint, cost + 1):
+                costLookUp[jumpPoint] = cost
+                parents[jumpPoint] = state
+                directions[jumpPoint] = (axis, step)
+                if jumpPoint in explored:
+                    explored.remove(jumpPoint)
+                    numReopens += 1
+                heapq.heappush(frontier, (cost + heuristic(jumpPoint), -cost, jumpPoint))
+                numPushes += 1
+
+    # no objective can be reached from the start
+    record_search(numPushes, numPushes, numNeighbors, numReopens)
+    return [], len(explored) + numFieldExplored
+
+def bidirectional(maze):
+    # breadth first search forward from the start and backward from all objectives at
+    # the same time, one whole level of the smaller side at a time. Once a level reaches
+    # states the other side has seen, the shortest of those meetings is the path
+    start = maze.getStartState()
+    goals = maze.getObjectiveStates()
+    forwardDepth = {start: 0}
+    backwardDepth = dict((goal, 0) for goal in goals)
+    forwardParents = {start: None}
+    backwardParents = dict((goal, None) for goal in goals)
+    forwardFrontier = [start]
+    backwardFrontier = list(backwardDepth)
+    numExplored = 0
+    numNeighbors = 0
+
+    meeting = start if start in backwardDepth else None
+    while meeting is None and forwardFrontier and backwardFrontier:
+        if len(forwardFrontier) <= len(backwardFrontier):
+            frontier, depth, parents, otherDepth = forwardFrontier, forwardDepth, forwardParents, backwardDepth
+        else:
+            frontier, depth, parents, otherDepth = backwardFrontier, backwardDepth, backwardParents, forwardDepth
+
+        nextFrontier = []
+        bestLength = None
+        for state in frontier:
+            numExplored += 1
+            neighbors = maze.getStateNeighbors(state)
+            numNeighbors += len(neighbors)
+            for neighbor in neighbors:
+                if neighbor in depth:
+                    continue
+                depth[neighbor] = depth[state] + 1
+                parents[neighbor] = state
+                nextFrontier.append(neighbor)
+                if neighbor in otherDepth:
+                    length = depth[neighbor] + otherDepth[neighbor]
+                    if bestLength is None or length < bestLength:
+                        bestLength = length
+                        meeting = neighbor
+
+        if frontier is forwardFrontier:
+            forwardFrontier = nextFrontier
+        else:
+            backwardFrontier = nextFrontier
+
+    record_search(0, 0, numNeighbors, 0)
+    if meeting is None:
+        return [], numExplored
+
+    with stats.timePhase("search.path"):
+        path = get_solution(forwardParents, meeting)
+        state = backwardParents[meeting]
+        while state is not None:
+            path.append(state)
+            state = backwardParents[state]
+        path = [maze.stateToPosition(position) for position in path]
+    return path, numExplored
+
+def descent(maze):
+    # follows the cached distance field of the maze downhill from the start. The field is
+    # computed on the first call, which counts the states its search expanded as explored.
+    # Later calls from any start take one step per move and count the states of the path
+    field, numFieldExplored = get_distance_field(maze)
+    state = maze.getStartState()
+    if field[state] < 0:
+        return [], numFieldExplored
+
+    path = [state]
+    while field[state] > 0:
+        for neighbor in maze.getStateNeighbors(state):
+            if field[neighbor] == field[state] - 1:
+                state = neighbor
+                break
+        path.append(state)
+    return [maze.stateToPosition(position) for position in path], numFieldExplored or len(path)
+
+def record_search(pushes, pops, neighbors, reopens):
+    # adds the counts of one search to the stats
+    stats.count("search.heapPushes", pushes)
+    stats.count("search.heapPops", pops)
+    stats.count("search.neighbors", neighbors)
+    stats.count("search.reopens", reopens)
+
+def get_distance_field(maze):
+    # returns the distance field of the maze and the number of states its breadth first
+    # search expanded, which is 0 when the field was already cached
+    if maze.hasDistanceField():
+        return maze.getDistanceField(), 0
+    field = maze.getDistanceField()
+    return field, int(np.count_nonzero(field >= 0))
+
+def get_distance_heuristic(maze):
+    # returns the exact number of moves to the closest goal from the distance field, with
+    # the number of states expanded to build the field
+    field, numFieldExplored = get_distance_field(maze)
+    unreachable = np.iinfo(np.int32).max
+
+    def heuristic(state):
+        distance = int(field[state])
+        return distance if distance >= 0 else unreachable
+
+    return heuristic, numFieldExplored
+
+def get_manhattan_heuristic(maze, goals):
+    # returns a function that gives the number of moves from a state to the closest goal
+    # when there are no walls. It never overestimates, so astar finds a shortest path
+    if len(goals) > MAX_GOALS_FOR_DIRECT_HEURISTIC:
+        # with many goals a lookup table over the whole maze is cheaper than a scan per state
+        sources = np.zeros(maze.getStateShape(), dtype=bool)
+        sources.ravel()[list(goals)] = True
+        table = manhattanDistanceTransform(sources).ravel()
+        return lambda state: int(table[state])
+
+    goalIndexes = [maze.stateToIndex(goal) for goal in goals]
+
+    def heuristic(state):
+        index = maze.stateToIndex(state)
+        return min(sum(abs(i - j) for i, j in zip(index, goal)) for goal in goalIndexes)
+
+    return heuristic
+
+def get_jump_solution(maze, parents, directions, state):
+    # follows the parents back to the start, filling in the states of every straight run
+    path = []
+    while parents[state] is not None:
+        parent = parents[state]
+        axis, step = directions[state]
+        path.extend(range(state, parent, -step))
+        state = parent
+    path.append(state)
+    path.reverse()
+    return [maze.stateToPosition(position) for position in path]
+
+def get_solution(parents, state):
+    # follows the parents back to the start which has parent set to None
+    path = []
+    while state is not None:
+        path.append(state)
+        state = parents[state]
+    path.reverse()
+    return path
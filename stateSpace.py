@@ -0,0 +1,174 @@
+# stateSpace.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the GridStateSpace class, which gives the mazes an index space
+interface where every cell is a flat integer state id.
+"""
+
+import numpy as np
+import stats
+
+class GridStateSpace:
+    """Mixin for grid mazes that numbers every cell with a flat integer state id.
+
+       The grid is padded with one wall cell on each side, so a neighbor of a state is
+       always state + offset for one of the stride offsets, and a neighbor is valid
+       exactly when it is free. No bounds checks are needed in the search loop.
+
+       Classes using it implement getGridShape, getFreeGrid, positionToIndex and
+       indexToPosition.
+    """
+
+    def getGridShape(self):
+        # Returns the shape of the grid without padding
+        raise NotImplementedError
+
+    def getFreeGrid(self):
+        # Returns a bool ndarray that is True for every cell that is not a wall
+        raise NotImplementedError
+
+    def positionToIndex(self, position):
+        # Returns the array index of the given position
+        raise NotImplementedError
+
+    def indexToPosition(self, index):
+        # Returns the position of the given array index
+        raise NotImplementedError
+
+    def buildStateIndex(self):
+        # Builds the padded shape, the strides and the neighbor offsets
+        shape = tuple(size + 2 for size in self.getGridShape())
+        self.__stateShape = shape
+        self.__strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+
+        # same order as getNeighbors: +alpha, -alpha, +beta, -beta, +gamma, -gamma
+        offsets = []
+        for stride in self.__strides:
+            offsets.append(stride)
+            offsets.append(-stride)
+        self.__offsets = offsets
+
+    def buildStateSpace(self):
+        # Builds the padded free mask
+        with stats.timePhase("maze.stateSpace"):
+            free = self.getFreeGrid()
+            padded = np.zeros(self.getStateShape(), dtype=bool)
+            padded[tuple(slice(1, -1) for size in free.shape)] = free
+
+        self.__free = padded.ravel()
+        # memoryview indexing is much cheaper than ndarray indexing for single cells
+        self.__freeView = memoryview(self.__free.view(np.uint8))
+
+    def resetStateSpace(self):
+        # Drops the free mask so it is rebuilt after the grid changes
+        self.__free = None
+        self.resetDistanceField()
+
+    def setFreeStates(self, states, free):
+        # Changes the free mask of the given states in place after their cells changed
+        if self.hasStateSpace():
+            self.__free[states] = free
+        self.resetDistanceField()
+
+    def hasStateIndex(self):
+        return getattr(self, '_GridStateSpace__strides', None) is not None
+
+    def hasStateSpace(self):
+        return getattr(self, '_GridStateSpace__free', None) is not None
+
+    def getStateShape(self):
+        # Returns the shape of the padded grid the state ids index
+        if not self.hasStateIndex():
+            self.buildStateIndex()
+        return self.__stateShape
+
+    def getStateOffsets(self):
+        # Returns the list of state id offsets from a state to its neighbors
+        if not self.hasStateIndex():
+            self.buildStateIndex()
+        return self.__offsets
+
+    def getFreeStates(self):
+        # Returns the flat bool ndarray indexed by state id, True if the state is not a wall
+        if not self.hasStateSpace():
+            self.buildStateSpace()
+        return self.__free
+
+    def indexToState(self, index):
+        if not self.hasStateIndex():
+            self.buildStateIndex()
+        state = 0
+        for i, stride in zip(index, self.__strides):
+            state += (i + 1) * stride
+        return state
+
+    def stateToIndex(self, state):
+        if not self.hasStateIndex():
+            self.buildStateIndex()
+        index = []
+        for stride in self.__strides:
+            i, state = divmod(state, stride)
+            index.append(i - 1)
+        return tuple(index)
+
+    def positionToState(self, position):
+        return self.indexToState(self.positionToIndex(position))
+
+    def stateToPosition(self, state):
+        return self.indexToPosition(self.stateToIndex(state))
+
+    def getStartState(self):
+        return self.positionToState(self.getStart())
+
+    def getObjectiveStates(self):
+        return [self.positionToState(objective) for objective in self.getObjectives()]
+
+    def isFreeState(self, state):
+        if not self.hasStateSpace():
+            self.buildStateSpace()
+        return self.__freeView[state] != 0
+
+    def getStateNeighbors(self, state):
+        # Returns list of neighboring states that can be moved to from the given state
+        if not self.hasStateSpace():
+            self.buildStateSpace()
+        free = self.__freeView
+        return [state + offset for offset in self.__offsets if free[state + offset]]
+
+    def getDistanceField(self):
+        """Returns the number of moves from every state to the closest objective, -1 if no
+           objective can be reached. It is computed once with a breadth first search from
+           all objectives at the same time and cached until the grid or objectives change.
+        """
+        if not self.hasDistanceField():
+            with stats.timePhase("maze.distanceField"):
+                self.__distanceField = self.computeDistanceField(self.getObjectiveStates())
+        return self.__distanceField
+
+    def hasDistanceField(self):
+        return getattr(self, '_GridStateSpace__distanceField', None) is not None
+
+    def resetDistanceField(self):
+        self.__distanceField = None
+
+    def computeDistanceField(self, sources):
+        # Expands one whole level of the search at a time with array operations
+        free = self.getFreeStates()
+        offsets = np.array(self.getStateOffsets())
+        distance = np.full(free.shape, -1, dtype=np.int32)
+
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        distance[frontier] = 0
+        level = 0
+        while frontier.size > 0:
+            level += 1
+            candidates = (frontier[:, np.newaxis] + offsets).ravel()
+            candidates = candidates[free[candidates] & (distance[candidates] < 0)]
+            frontier = np.unique(candidates)
+            distance[frontier] = level
+        return distance
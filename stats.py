@@ -0,0 +1,103 @@
+# stats.py
+# ---------------
+# Licensing Information:  You are free to use or extend this projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to the University of Illinois at Urbana-Champaign
+
+"""
+This file contains the instrumentation counters and phase timers of the transform, the
+collision tests, the maze and the search. They are off by default, and then every count
+is a single check of a flag. mp1.py and mp2.py turn them on with --stats.
+"""
+
+import time
+from contextlib import contextmanager
+import numpy as np
+from const import *
+
+# maze characters counted by countCells, with the name of their counter
+CELL_CATEGORIES = [("wall", WALL_CHAR), ("free", SPACE_CHAR), ("objective", OBJECTIVE_CHAR), ("start", START_CHAR)]
+
+# the counters and timers only change while this is True
+enabled = False
+counters = {}
+timers = {}
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def isEnabled():
+    return enabled
+
+def reset():
+    # Sets every counter and timer back to zero
+    counters.clear()
+    timers.clear()
+
+def count(name, amount=1):
+    # Adds the amount to the counter of the given name
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+def countCells(name, cells):
+    # Adds the number of cells of every maze character in the uint8 cells to name.<category>
+    if enabled:
+        numCells = np.bincount(np.asarray(cells, dtype=np.uint8).ravel(), minlength=256)
+        for category, char in CELL_CATEGORIES:
+            count(name + "." + category, int(numCells[ord(char)]))
+
+@contextmanager
+def timePhase(name):
+    # Adds the time spent in the with block to the timer of the given phase
+    if not enabled:
+        yield
+        return
+    startTime = time.perf_counter()
+    try:
+        yield
+    finally:
+        timers[name] = timers.get(name, 0.0) + time.perf_counter() - startTime
+
+def getStats():
+    """Returns the counters and the phase timers in seconds.
+
+        Return:
+            dict: {"counters": {name: count}, "timers": {phase: seconds}}, sorted by name
+    """
+    return {"counters": dict(sorted(counters.items())), "timers": dict(sorted(timers.items()))}
+
+def mergeStats(stats):
+    # Adds the counters and timers of getStats, e.g. the ones of a worker process, to these ones
+    if enabled:
+        for name, value in stats["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+        for name, value in stats["timers"].items():
+            timers[name] = timers.get(name, 0.0) + value
+
+def callCounted(counted, function, *args):
+    """Calls the function in a worker process of a pool, whose counters and timers do not
+       reach the parent process. The parent passes counted=isEnabled() and gives the stats
+       of every call to mergeStats.
+
+        Return:
+            (result of the function, stats of the call, or None when not counted)
+    """
+    if not counted:
+        return function(*args), None
+    # a forked worker starts with the counts of the parent, which the parent already has
+    enable()
+    reset()
+    result = function(*args)
+    return result, getStats()
+
+def formatStats(stats):
+    # Returns the stats of getStats as one line per counter and timer
+    lines = ["%-36s %14d" % (name, value) for name, value in stats["counters"].items()]
+    lines += ["%-36s %14.4f s" % (name, value) for name, value in stats["timers"].items()]
+    return "\n".join(lines)
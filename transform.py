@@ -12,15 +12,25 @@
 This file contains the transform function that converts the robot arm map
 to the maze.
 """
-import copy
-from arm import Arm
+import itertools
+import multiprocessing
+import numpy as np
+import stats
+from arm import computeArmGridJoints, computeArmJointsBatch, getArmAngleAxes, jointsToArmPos, lookUpCosSin
 from maze import Maze
-from search import *
-from geometry import *
+from geometry import doesArmTouchObstacles, doesArmTouchGoals, isArmWithinWindow, doesCircleLineCollideBatch, \
+                     doesArmTouchGoalsBatch, doesLinkTouchObstaclesBatch, \
+                     getArmCollisionMasks, ObstacleIndex
 from const import *
-from util import *
+from util import angleToIdx
 
-def transformToMaze(arm, goals, obstacles, window, granularity):
+# number of cells classified at once by the numpy engine, bounds its temporary arrays
+CELLS_PER_CHUNK = 1 << 16
+
+# number of alpha slices every worker of the parallel transform gets on average
+SLICES_PER_WORKER = 4
+
+def transformToMaze(arm, goals, obstacles, window, granularity, engine="loop", workers=1):
     """This function transforms the given 2D map to the maze in MP1.
     
         Args:
@@ -29,16 +39,56 @@ def transformToMaze(arm, goals, obstacles, window, granularity):
             obstacles (list): [(x, y, r)] of obstacles
             window (tuple): (width, height) of the window
             granularity (int): unit of increasing/decreasing degree for angles
+            engine (str): "loop" to classify cell by cell, "numpy" to classify whole
+                          blocks of the grid at once, "prefix" to test every link once
+                          per prefix of the angles it depends on. All build the same maze.
+                          "lazy" returns a LazyMaze that classifies cells on first use.
+            workers (int): number of processes that share the alpha rows, 1 to run in
+                           this process
 
         Return:
             Maze: the maze instance generated based on input arguments.
 
     """
-    if(arm.getNumArmLinks() == 3): 
-        return transformToMazeFor3Arms(arm, goals, obstacles, window, granularity)
-    if(arm.getNumArmLinks() == 1):
-        return transformToMazeFor1Arm(arm, goals, obstacles, window, granularity)
+    if engine not in TRANSFORM_ENGINES:
+        print("Unknown transform engine %s" % (engine))
+        raise SystemExit
+    if not isinstance(obstacles, ObstacleIndex):
+        with stats.timePhase("transform.obstacleIndex"):
+            obstacles = ObstacleIndex(obstacles, arm.getBase(), arm.getArmLinkLengths())
+    if engine == "lazy":
+        from lazyMaze import LazyMaze
+        with stats.timePhase("transform.lazy"):
+            return LazyMaze(arm, goals, obstacles, window, granularity)
+
+    with stats.timePhase("transform." + engine):
+        if workers > 1:
+            maze = transformToMazeParallel(arm, goals, obstacles, window, granularity, engine, workers)
+        elif engine == "numpy" or engine == "prefix":
+            maze = transformToMazeNumpy(arm, goals, obstacles, window, granularity, engine)
+        elif(arm.getNumArmLinks() == 3):
+            maze = transformToMazeFor3Arms(arm, goals, obstacles, window, granularity)
+        elif(arm.getNumArmLinks() == 1):
+            maze = transformToMazeFor1Arm(arm, goals, obstacles, window, granularity)
+        else:
+            maze = transformToMazeFor2Arms(arm, goals, obstacles, window, granularity)
+    stats.countCells("transform.cells", maze.getMap())
+    return maze
+
+def transformToMazeFor2Arms(arm, goals, obstacles, window, granularity):
+    """This function transforms the given 2D map to the maze in MP1.
+    
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
 
+        Return:
+            Maze: the maze instance generated based on input arguments.
+
+    """
     alphaLimits, betaLimits = arm.getArmLimit()
     alphaMin, alphaMax = alphaLimits
     betaMin, betaMax = betaLimits
@@ -66,7 +116,6 @@ def transformToMaze(arm, goals, obstacles, window, granularity):
             if(isWallFirstArm):
                 for y in range(cols):
                     row.append(WALL_CHAR)
-                map.append(row)
                 break
             
             isWall = doesArmTouchObstacles(armPos, obstacles) or not isArmWithinWindow(armPos, window)
@@ -133,8 +182,8 @@ def transformToMazeFor3Arms(arm, goals, obstacles, window, granularity):
         armPos = arm.getArmPos()
         isWallFirstArm = doesArmTouchObstacles([armPos[0]], obstacles) or not isArmWithinWindow([armPos[0]], window)
         if(isWallFirstArm):
-            depth = []
             for y in range(cols):
+                depth = []
                 for z in range(depths):
                     depth.append(WALL_CHAR)
                 row.append(depth)
@@ -256,4 +305,426 @@ def transformToMazeFor1Arm(arm, goals, obstacles, window, granularity):
     map[startAlpha] = START_CHAR
 
     maze = Maze(map, (alphaMin,), granularity)
-    return maze
\ No newline at end of file
+    return maze
+
+def classifyArmPositions(armPos, goals, obstacles, window):
+    """This function classifies a batch of arm configurations into maze characters.
+    
+        Args:
+            armPos (ndarray): (N, links, 2, 2) start and end position of all arm links
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+
+        Return:
+            ndarray: N maze characters as uint8 codes (WALL_CHAR, OBJECTIVE_CHAR or SPACE_CHAR)
+    """
+    isWall, isObjective = getArmCollisionMasks(armPos, goals, obstacles, window)
+    cells = np.full(len(isWall), ord(SPACE_CHAR), dtype=np.uint8)
+    cells[isObjective] = ord(OBJECTIVE_CHAR)
+    cells[isWall] = ord(WALL_CHAR)
+    return cells
+
+def getMazeShape(arm, granularity):
+    """This function returns (offsets, shape) of the maze for the given arm and granularity
+    """
+    limits = arm.getArmLimit()
+    offsets = tuple(limit[0] for limit in limits)
+    shape = tuple(int(((limit[1] - limit[0]) / granularity) + 1) for limit in limits)
+    return offsets, shape
+
+def classifyArmAngles(arm, angles, goals, obstacles, window):
+    """This function classifies arbitrary arm configurations into maze characters.
+    
+        Args:
+            arm (Arm): arm instance
+            angles (ndarray): (N, links) relative angles (alpha, beta, gamma) of the arm links
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+
+        Return:
+            ndarray: N maze characters as uint8 codes
+    """
+    if len(angles) == 0:
+        return np.empty(0, dtype=np.uint8)
+    angles = np.asarray(angles).reshape(len(angles), -1)
+    armLinkLengths = arm.getArmLinkLengths()
+    cells = np.empty(len(angles), dtype=np.uint8)
+    for chunkStart in range(0, len(angles), CELLS_PER_CHUNK):
+        chunk = slice(chunkStart, chunkStart + CELLS_PER_CHUNK)
+        joints = computeArmJointsBatch(arm.getBase(), armLinkLengths, angles[chunk])
+        cells[chunk] = classifyArmPositions(jointsToArmPos(joints), goals, obstacles, window)
+    return cells
+
+def transformMaskedCells(arm, goals, obstacles, window, granularity, mask):
+    """This function classifies only the cells of the maze grid selected by the mask, every
+       other cell is a wall. The start is added like in transformToMaze.
+    
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
+            mask (ndarray): bool grid with the shape of the maze, True for cells to classify
+
+        Return:
+            ndarray: uint8 maze characters, alpha is the first axis
+    """
+    offsets, shape = getMazeShape(arm, granularity)
+    map = np.full(shape, ord(WALL_CHAR), dtype=np.uint8)
+
+    indexes = np.argwhere(mask)
+    angles = indexes * granularity + np.asarray(offsets)
+    map[mask] = classifyArmAngles(arm, angles, goals, obstacles, window)
+
+    startIndexes = angleToIdx(arm.getArmAngle(), offsets, granularity)
+    map[startIndexes] = ord(START_CHAR)
+    return map
+
+def applyObstacleDiff(obstacles, added=(), removed=(), moved=()):
+    """This function applies a change of the scene to the list of obstacles.
+    
+        Args:
+            obstacles (list): [(x, y, r)] of obstacles before the change
+            added (list): [(x, y, r)] of new obstacles
+            removed (list): [(x, y, r)] of obstacles that are gone
+            moved (list): [((x, y, r), (x, y, r))] of obstacles and where they moved to
+
+        Return:
+            (obstacles, changed): the list of obstacles after the change and the list of
+                                  every circle a cell of the maze can have changed for
+    """
+    gone = list(removed) + [old for old, new in moved]
+    came = list(added) + [new for old, new in moved]
+    obstacles = list(obstacles)
+    for obstacle in gone:
+        obstacles.remove(obstacle)
+    obstacles.extend(came)
+    return obstacles, gone + came
+
+def getCirclesTouchedMask(arm, granularity, circles):
+    """This function finds every cell of the maze grid where an arm link touches one of the
+       circles. Links are added one at a time over the prefixes of the angle axes, and a
+       prefix is dropped once the rest of the arm can not reach any circle from its joint,
+       so only the cells near the circles are ever computed.
+    
+        Args:
+            arm (Arm): arm instance
+            granularity (int): unit of increasing/decreasing degree for angles
+            circles (list): [(x, y, r)] of circles
+
+        Return:
+            ndarray: bool grid with the shape of the maze, True where the arm touches a circle
+    """
+    axes = getArmAngleAxes(arm, granularity)
+    armLinkLengths = arm.getArmLinkLengths()
+    touched = np.zeros(tuple(len(axis) for axis in axes), dtype=bool)
+    if len(circles) == 0:
+        return touched
+    circles = np.asarray(circles, dtype=np.float64)
+
+    prefixes, totalAngles, joints = getEmptyArmPrefix(arm)
+    for i in range(len(axes)):
+        # the rest of the arm stays within the sum of its lengths of the joint, one more
+        # unit keeps rounding from dropping a prefix the collision test would count
+        reach = sum(armLinkLengths[i:]) + circles[:, 2] + 1
+        distance = np.hypot(joints[:, np.newaxis, 0] - circles[:, 0], joints[:, np.newaxis, 1] - circles[:, 1])
+        near = np.any(distance <= reach, axis=1)
+        prefixes, totalAngles, joints = prefixes[near], totalAngles[near], joints[near]
+
+        nextPrefixes, nextAngles, nextJoints = [], [], []
+        for chunk, indexes, angles, starts, ends in expandArmPrefixes(axes, armLinkLengths, i, prefixes,
+                                                                      totalAngles, joints):
+            hits = doesCircleLineCollideBatch(starts, ends, circles)
+            # every cell that starts with a touching prefix touches
+            touched[tuple(indexes[hits].T)] = True
+            nextPrefixes.append(indexes[~hits])
+            nextAngles.append(angles[~hits])
+            nextJoints.append(ends[~hits])
+
+        if len(nextPrefixes) == 0:
+            break
+        prefixes = np.concatenate(nextPrefixes)
+        totalAngles = np.concatenate(nextAngles)
+        joints = np.concatenate(nextJoints)
+    return touched
+
+def getEmptyArmPrefix(arm):
+    """This function returns the prefix of the angle axes with no angles yet, which is where
+       expandArmPrefixes starts. A prefix is one row of each array: its indexes, its total
+       angle and the position of its last joint.
+    """
+    prefixes = np.zeros((1, 0), dtype=int)
+    totalAngles = np.zeros(1, dtype=int)
+    joints = np.array([arm.getBase()], dtype=np.float64)
+    return prefixes, totalAngles, joints
+
+def expandArmPrefixes(axes, armLinkLengths, link, prefixes, totalAngles, joints):
+    """This function extends every prefix of the angle axes by every angle of the given arm
+       link and computes where the link lies for each of them. It goes a chunk of prefixes
+       at a time, so the temporary arrays stay bounded.
+    
+        Args:
+            axes (list): angles of every axis of the maze, from getArmAngleAxes
+            armLinkLengths (list): length of every arm link
+            link (int): index of the arm link the prefixes are extended by
+            prefixes (ndarray): (N, link) indexes of the prefixes
+            totalAngles (ndarray): N total angles of the prefixes
+            joints (ndarray): (N, 2) positions of the last joint of the prefixes
+
+        Return:
+            generator of (chunk, indexes, angles, starts, ends) per chunk: the slice of the
+            prefixes it extends, the (M, link + 1) indexes and the M total angles of the new
+            prefixes, and the (M, 2) start and end positions of the link for each of them
+    """
+    size = len(axes[link])
+    prefixesPerChunk = max(1, CELLS_PER_CHUNK // size)
+    for chunkStart in range(0, len(prefixes), prefixesPerChunk):
+        chunk = slice(chunkStart, chunkStart + prefixesPerChunk)
+        count = len(prefixes[chunk])
+        indexes = np.concatenate((np.repeat(prefixes[chunk], size, axis=0),
+                                  np.tile(np.arange(size), count)[:, np.newaxis]), axis=1)
+        angles = np.repeat(totalAngles[chunk], size) + np.tile(axes[link], count)
+        starts = np.repeat(joints[chunk], size, axis=0)
+
+        # same arithmetic as computeArmGridJoints, so the positions are identical
+        cos, sin = lookUpCosSin(angles)
+        ends = np.empty_like(starts)
+        ends[:, 0] = starts[:, 0] + (cos * armLinkLengths[link])
+        ends[:, 1] = starts[:, 1] - (sin * armLinkLengths[link])
+        yield chunk, indexes, angles, starts, ends
+
+def updateMazeObstacles(maze, arm, goals, obstacles, window, changed):
+    """This function updates the maze in place after the obstacles changed. Only the cells
+       where the arm touches one of the changed circles can have changed, so every cell is
+       tested against those few circles and only the ones that touch are classified again.
+    
+        Args:
+            maze (Maze): maze transformed with the obstacles before the change
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles after the change
+            window (tuple): (width, height) of the window
+            changed (list): [(x, y, r)] of the circles that were added or removed
+
+        Return:
+            list: state ids of the cells whose character changed
+    """
+    granularity = maze.granularity
+    offsets, shape = getMazeShape(arm, granularity)
+    indexes = np.argwhere(getCirclesTouchedMask(arm, granularity, changed))
+
+    # the start keeps its character like in transformToMaze
+    startIndexes = maze.positionToIndex(maze.getStart())
+    indexes = indexes[np.any(indexes != np.asarray(startIndexes), axis=1)]
+
+    angles = indexes * granularity + np.asarray(offsets)
+    cells = classifyArmAngles(arm, angles, goals, obstacles, window)
+    changes = cells != maze.getMap()[tuple(indexes.T)]
+    maze.setCells(indexes[changes], cells[changes])
+    return [maze.indexToState(index) for index in indexes[changes].tolist()]
+
+def transformToMazeNumpy(arm, goals, obstacles, window, granularity, engine="numpy"):
+    """This function transforms the given 2D map to the maze in MP1 by classifying blocks
+       of alpha rows at once with the batch forward kinematics and collision kernel.
+    
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
+            engine (str): "numpy" or "prefix"
+
+        Return:
+            Maze: the maze instance generated based on input arguments.
+
+    """
+    offsets, shape = getMazeShape(arm, granularity)
+    map = transformRows(arm, goals, obstacles, window, granularity, slice(0, shape[ALPHA]), engine)
+
+    # adds start to maze
+    startIndexes = angleToIdx(arm.getArmAngle(), offsets, granularity)
+    map[startIndexes] = ord(START_CHAR)
+
+    maze = Maze(map, offsets, granularity)
+    return maze
+
+def transformToMazeParallel(arm, goals, obstacles, window, granularity, engine, workers):
+    """This function transforms the given 2D map to the maze in MP1 by splitting the alpha
+       rows across a pool of worker processes. Rows do not depend on each other, and every
+       task gets its own copy of the arm since setArmAngle changes it.
+    
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
+            engine (str): engine that classifies the rows of every slice
+            workers (int): number of worker processes
+
+        Return:
+            Maze: the maze instance generated based on input arguments.
+
+    """
+    offsets, shape = getMazeShape(arm, granularity)
+
+    # a few slices per worker so a slow slice does not hold up the others
+    numSlices = min(shape[ALPHA], workers * SLICES_PER_WORKER)
+    bounds = np.linspace(0, shape[ALPHA], numSlices + 1).astype(int)
+    tasks = []
+    for i in range(numSlices):
+        rows = slice(int(bounds[i]), int(bounds[i + 1]))
+        tasks.append((stats.isEnabled(), arm, goals, obstacles, window, granularity, rows, engine))
+
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(transformRowsTask, tasks)
+    slices = []
+    for rowsMap, taskStats in results:
+        slices.append(rowsMap)
+        if taskStats is not None:
+            stats.mergeStats(taskStats)
+    map = np.concatenate(slices, axis=ALPHA)
+
+    # adds start to maze
+    startIndexes = angleToIdx(arm.getArmAngle(), offsets, granularity)
+    map[startIndexes] = ord(START_CHAR)
+
+    maze = Maze(map, offsets, granularity)
+    return maze
+
+def transformRowsTask(task):
+    # unpacks a task of the process pool, and returns its rows with the stats of the worker
+    return stats.callCounted(task[0], transformRows, *task[1:])
+
+def transformRows(arm, goals, obstacles, window, granularity, rows, engine="numpy"):
+    """This function classifies the cells of the given alpha rows of the maze.
+    
+        Args:
+            arm (Arm): arm instance
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+            granularity (int): unit of increasing/decreasing degree for angles
+            rows (slice): range of alpha indexes to classify
+            engine (str): "loop", "numpy" or "prefix"
+
+        Return:
+            ndarray: uint8 maze characters of the rows, alpha is the first axis
+    """
+    if engine == "numpy":
+        return transformRowsNumpy(arm, goals, obstacles, window, granularity, rows)
+    if engine == "prefix":
+        return transformRowsPrefix(arm, goals, obstacles, window, granularity, rows)
+    return transformRowsLoop(arm, goals, obstacles, window, granularity, rows)
+
+def transformRowsNumpy(arm, goals, obstacles, window, granularity, rows):
+    # classifies blocks of rows at once, the blocks bound the size of temporary arrays
+    offsets, shape = getMazeShape(arm, granularity)
+    numLinks = len(shape)
+    rowStart, rowStop, step = rows.indices(shape[ALPHA])
+
+    cellsPerRow = int(np.prod(shape[1:]))
+    rowsPerChunk = max(1, CELLS_PER_CHUNK // cellsPerRow)
+
+    map = np.empty((rowStop - rowStart,) + shape[1:], dtype=np.uint8)
+    for chunkStart in range(rowStart, rowStop, rowsPerChunk):
+        chunk = slice(chunkStart, min(chunkStart + rowsPerChunk, rowStop))
+        joints = computeArmGridJoints(arm, granularity, chunk)
+        armPos = jointsToArmPos(joints).reshape(-1, numLinks, 2, 2)
+        cells = classifyArmPositions(armPos, goals, obstacles, window)
+        map[chunk.start - rowStart:chunk.stop - rowStart] = cells.reshape((-1,) + shape[1:])
+    return map
+
+def transformRowsPrefix(arm, goals, obstacles, window, granularity, rows):
+    # link i only depends on the first i + 1 angles, so it is tested once per prefix of
+    # those angles. A prefix where a link is a wall makes every cell that starts with it a
+    # wall, so it is dropped and the links after it are never computed for it
+    axes = getArmAngleAxes(arm, granularity)
+    axes[ALPHA] = axes[ALPHA][rows]
+    armLinkLengths = arm.getArmLinkLengths()
+    numLinks = len(axes)
+    width, height = window
+    map = np.full(tuple(len(axis) for axis in axes), ord(WALL_CHAR), dtype=np.uint8)
+
+    # every prefix also keeps whether one of its links passes through a goal
+    prefixes, totalAngles, joints = getEmptyArmPrefix(arm)
+    touchesGoals = np.zeros(1, dtype=bool)
+    for i in range(numLinks):
+        size = len(axes[i])
+        nextPrefixes, nextAngles, nextJoints, nextTouches = [], [], [], []
+        for chunk, indexes, angles, starts, ends in expandArmPrefixes(axes, armLinkLengths, i, prefixes,
+                                                                      totalAngles, joints):
+            points = np.concatenate((starts, ends), axis=1)
+            inside = np.all((points[:, 0::2] >= 0) & (points[:, 0::2] <= width) &
+                            (points[:, 1::2] >= 0) & (points[:, 1::2] <= height), axis=1)
+            isWall = ~inside | doesLinkTouchObstaclesBatch(starts, ends, obstacles, i)
+            touches = np.repeat(touchesGoals[chunk], size) | doesCircleLineCollideBatch(starts, ends, goals)
+
+            if i == numLinks - 1:
+                isObjective = doesArmTouchGoalsBatch(ends, goals)
+                isWall |= ~isObjective & touches
+                cells = np.where(isWall, ord(WALL_CHAR), np.where(isObjective, ord(OBJECTIVE_CHAR), ord(SPACE_CHAR)))
+                map[tuple(indexes.T)] = cells
+                continue
+
+            nextPrefixes.append(indexes[~isWall])
+            nextAngles.append(angles[~isWall])
+            nextJoints.append(ends[~isWall])
+            nextTouches.append(touches[~isWall])
+
+        if len(nextPrefixes) == 0:
+            break
+        prefixes = np.concatenate(nextPrefixes)
+        totalAngles = np.concatenate(nextAngles)
+        joints = np.concatenate(nextJoints)
+        touchesGoals = np.concatenate(nextTouches)
+    return map
+
+def transformRowsLoop(arm, goals, obstacles, window, granularity, rows):
+    # classifies cell by cell like the loop transforms, for any number of arm links
+    axes = [axis.tolist() for axis in getArmAngleAxes(arm, granularity)]
+    alphas = axes[ALPHA][rows]
+    shape = (len(alphas),) + tuple(len(axis) for axis in axes[1:])
+
+    map = np.empty(shape, dtype=np.uint8)
+    for x in range(len(alphas)):
+        # the first arm link only depends on alpha, if it is a wall the whole row is
+        arm.setArmAngle([alphas[x]] + [axis[0] for axis in axes[1:]])
+        armPos = arm.getArmPos()
+        if doesArmTouchObstacles([armPos[0]], obstacles) or not isArmWithinWindow([armPos[0]], window):
+            map[x] = ord(WALL_CHAR)
+            continue
+
+        for index in itertools.product(*[range(size) for size in shape[1:]]):
+            angles = [alphas[x]] + [axes[i + 1][index[i]] for i in range(len(index))]
+            arm.setArmAngle(angles)
+            map[(x,) + index] = ord(classifyArmPosition(arm.getArmPos(), arm.getEnd(), goals, obstacles, window))
+    return map
+
+def classifyArmPosition(armPos, armEnd, goals, obstacles, window):
+    """This function classifies a single arm configuration into a maze character.
+    
+        Args:
+            armPos (list): start and end position of all arm links [(start, end)]
+            armEnd (tuple): the arm tick position, (x-coordinate, y-coordinate)
+            goals (list): [(x, y, r)] of goals
+            obstacles (list): [(x, y, r)] of obstacles
+            window (tuple): (width, height) of the window
+
+        Return:
+            str: WALL_CHAR, OBJECTIVE_CHAR or SPACE_CHAR
+    """
+    if doesArmTouchObstacles(armPos, obstacles) or not isArmWithinWindow(armPos, window):
+        return WALL_CHAR
+
+    isObjective = doesArmTouchGoals(armEnd, goals)
+    if not isObjective and doesArmTouchObstacles(armPos, goals):
+        return WALL_CHAR
+
+    if isObjective:
+        return OBJECTIVE_CHAR
+    return SPACE_CHAR
@@ -12,6 +12,8 @@
 This file contains helper functions that helps other modules, 
 """
 
+import numpy as np
+
 # Transform between angles (alpha, beta, gamma) and array index
 def angleToIdx(angles, offsets, granularity):
     result = []
@@ -29,4 +31,42 @@ def isValueInBetween(valueRange, target):
     if target < min(valueRange) or target > max(valueRange):
         return False
     else:
-        return True
\ No newline at end of file
+        return True
+
+def loadMapConfig(config, map_name):
+    """Reads one map section of the config file.
+
+        Args:
+            config (ConfigParser): parsed config file
+            map_name (str): name of the map section
+
+        Return:
+            (window, armBase, armLinks, obstacles, goals) of the map
+    """
+    window = eval(config.get(map_name, 'Window'))
+    armBase = eval(config.get(map_name, 'ArmBase'))
+    armLinks = eval(config.get(map_name, 'ArmLinks'))
+    obstacles = eval(config.get(map_name, 'Obstacles'))
+    goals = eval(config.get(map_name, 'Goals'))
+    return window, armBase, armLinks, obstacles, goals
+
+def manhattanDistanceTransform(sources):
+    """Computes the manhattan distance from every cell of a grid to the closest source cell,
+       ignoring walls. The L1 distance is separable, so one forward and one backward
+       sweep along every axis is enough.
+
+        Args:
+            sources (ndarray): bool grid, True for the source cells
+
+        Return:
+            ndarray: int32 grid of distances, same shape as sources
+    """
+    unreached = np.iinfo(np.int32).max // 2
+    distance = np.where(sources, 0, unreached).astype(np.int32)
+    for axis in range(distance.ndim):
+        view = np.moveaxis(distance, axis, 0)
+        for i in range(1, view.shape[0]):
+            np.minimum(view[i], view[i - 1] + 1, out=view[i])
+        for i in range(view.shape[0] - 2, -1, -1):
+            np.minimum(view[i], view[i + 1] + 1, out=view[i])
+    return distance